@@ -0,0 +1,205 @@
+"""
+Approximate nearest-neighbor engine over reduced-dimension game embeddings.
+
+TruncatedSVD projects the sparse TF-IDF matrix to a dense float32 space
+(L2-normalized, so cosine is a dot product). An IVF index — spherical
+k-means centroids plus one inverted list of rows per centroid — then limits
+each query to the `n_probe` closest lists instead of the whole catalog.
+
+Knobs: `dims` (embedding size), `n_lists` (coarse clusters, build time) and
+`n_probe` (lists scanned per query — higher is slower but more accurate).
+"""
+import time
+
+import numpy as np
+from sklearn.decomposition import TruncatedSVD
+from sklearn.metrics.pairwise import cosine_similarity
+
+from recommender import top_n
+
+DEFAULT_DIMS    = 192
+DEFAULT_N_PROBE = 8
+
+
+# ─────────────────────────────────────────────
+# EMBEDDINGS
+# ─────────────────────────────────────────────
+def _l2(x: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(x, axis=-1, keepdims=True)
+    return x / np.maximum(norms, 1e-12)
+
+
+def build_embeddings(tfidf_matrix, dims: int = DEFAULT_DIMS, seed: int = 42):
+    """
+    Project `tfidf_matrix` to `dims` dense dimensions.
+
+    Returns `(embeddings, components)`: L2-normalized float32 rows and the
+    float32 SVD basis (dims × F) used to embed new rows later.
+    """
+    dims = max(1, min(dims, tfidf_matrix.shape[1] - 1))
+    svd  = TruncatedSVD(n_components=dims, random_state=seed)
+    emb  = svd.fit_transform(tfidf_matrix).astype(np.float32)
+    return _l2(emb), svd.components_.astype(np.float32)
+
+
+def embed_rows(rows_matrix, components: np.ndarray) -> np.ndarray:
+    """Embed TF-IDF rows with a stored SVD basis (same space as the catalog)."""
+    return _l2(np.asarray(rows_matrix @ components.T, dtype=np.float32))
+
+
+# ─────────────────────────────────────────────
+# IVF INDEX
+# ─────────────────────────────────────────────
+def _assign(emb: np.ndarray, centroids: np.ndarray, block_size: int = 8192) -> np.ndarray:
+    out = np.empty(len(emb), dtype=np.int32)
+    for start in range(0, len(emb), block_size):
+        out[start:start + block_size] = np.argmax(emb[start:start + block_size] @ centroids.T, axis=1)
+    return out
+
+
+def build_ivf(emb: np.ndarray, n_lists: int = None, n_iter: int = 10,
+              sample: int = 50_000, seed: int = 42) -> dict:
+    """
+    Spherical k-means over (a sample of) `emb`, then one inverted list per
+    centroid. Lists are stored CSR-style: rows of list `c` are
+    `list_rows[list_offsets[c]:list_offsets[c + 1]]`.
+    """
+    rng = np.random.default_rng(seed)
+    n   = len(emb)
+    n_lists = int(n_lists or max(1, round(np.sqrt(n))))
+    n_lists = min(n_lists, n)
+
+    train = emb[rng.choice(n, size=min(sample, n), replace=False)]
+    centroids = train[rng.choice(len(train), size=n_lists, replace=False)].copy()
+    for _ in range(n_iter):
+        labels = _assign(train, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, train)
+        counts = np.bincount(labels, minlength=n_lists)
+        empty  = counts == 0
+        if empty.any():   # re-seed empty clusters from random training rows
+            sums[empty] = train[rng.choice(len(train), size=int(empty.sum()), replace=False)]
+        centroids = _l2(sums).astype(np.float32)
+
+    labels  = _assign(emb, centroids)
+    order   = np.argsort(labels, kind='stable').astype(np.int32)
+    offsets = np.zeros(n_lists + 1, dtype=np.int64)
+    np.cumsum(np.bincount(labels, minlength=n_lists), out=offsets[1:])
+    return {'centroids': centroids, 'list_offsets': offsets, 'list_rows': order}
+
+
+def ann_search(index: dict, emb: np.ndarray, query: np.ndarray, n: int,
+               mask: np.ndarray = None, n_probe: int = DEFAULT_N_PROBE):
+    """
+    Approximate top-`n` rows for one normalized `query` embedding.
+
+    Scans the `n_probe` lists whose centroids are closest to the query.
+    Returns `(rows, scores)` best first; `scores` are embedding cosines for
+    the returned rows. May return fewer than `n` rows when the probed lists
+    hold too few rows passing `mask`.
+    """
+    query   = np.asarray(query, dtype=np.float32).ravel()
+    cscores = index['centroids'] @ query
+    n_probe = min(n_probe, len(cscores))
+    probe   = np.argpartition(-cscores, n_probe - 1)[:n_probe]
+
+    offsets, rows = index['list_offsets'], index['list_rows']
+    cand = np.concatenate([rows[offsets[c]:offsets[c + 1]] for c in probe])
+    if mask is not None:
+        cand = cand[mask[cand]]
+    if cand.size == 0:
+        return cand.astype(np.int64), np.zeros(0, dtype=np.float32)
+    scores = np.asarray(emb[cand] @ query, dtype=np.float32)
+    keep   = top_n(scores, np.ones(cand.size, dtype=bool), n)
+    return cand[keep].astype(np.int64), scores[keep]
+
+
+def ann_arrays(emb: np.ndarray, components: np.ndarray, index: dict) -> dict:
+    """Bundle array names for the embedding stage and its IVF index."""
+    return {'ann.embeddings':   emb,
+            'ann.components':   components,
+            'ann.centroids':    index['centroids'],
+            'ann.list_offsets': index['list_offsets'],
+            'ann.list_rows':    index['list_rows']}
+
+
+def ann_from_bundle(bundle: dict):
+    """`(embeddings, components, index)` from a loaded bundle, or None."""
+    arrays = bundle['arrays']
+    if 'ann.embeddings' not in arrays:
+        return None
+    index = {k: arrays[f'ann.{k}'] for k in ('centroids', 'list_offsets', 'list_rows')}
+    return arrays['ann.embeddings'], arrays['ann.components'], index
+
+
+# ─────────────────────────────────────────────
+# RECALL BENCHMARK
+# ─────────────────────────────────────────────
+def recall_at_k(tfidf_matrix, emb: np.ndarray, index: dict, queries,
+                k: int = 10, n_probe: int = DEFAULT_N_PROBE) -> dict:
+    """
+    Mean recall@k of ANN vs exact TF-IDF cosine for single-game queries,
+    plus mean per-query latency of both engines (ms).
+    """
+    recalls, t_exact, t_ann = [], 0.0, 0.0
+    everything = np.ones(tfidf_matrix.shape[0], dtype=bool)
+    for q in queries:
+        everything[q] = False
+
+        t0 = time.perf_counter()
+        exact = cosine_similarity(tfidf_matrix[q], tfidf_matrix).ravel()
+        truth = set(top_n(exact, everything, k).tolist())
+        t1 = time.perf_counter()
+        found, _ = ann_search(index, emb, emb[q], k, mask=everything, n_probe=n_probe)
+        t2 = time.perf_counter()
+
+        everything[q] = True
+        t_exact += t1 - t0
+        t_ann   += t2 - t1
+        recalls.append(len(truth & set(found.tolist())) / k)
+
+    n_q = max(len(recalls), 1)
+    return {'k': k, 'n_probe': n_probe, 'recall': float(np.mean(recalls)),
+            'exact_ms': 1e3 * t_exact / n_q, 'ann_ms': 1e3 * t_ann / n_q}
+
+
+# ─────────────────────────────────────────────
+# INCREMENTAL CATALOG UPDATES
+# ─────────────────────────────────────────────
+def update_ivf(index: dict, emb: np.ndarray, changed) -> dict:
+    """
+    Re-file `changed` rows of the updated embeddings `emb` (appended rows
+    included) into their nearest existing lists; centroids stay fixed until
+    the next full rebuild.
+    """
+    offsets, rows = index['list_offsets'], index['list_rows']
+    labels = np.empty(len(emb), dtype=np.int32)
+    labels[np.asarray(rows)] = np.repeat(np.arange(len(offsets) - 1, dtype=np.int32), np.diff(offsets))
+    changed = np.asarray(changed, dtype=np.int64)
+    if changed.size:
+        labels[changed] = _assign(emb[changed], index['centroids'])
+
+    n_lists = len(index['centroids'])
+    new_offsets = np.zeros(n_lists + 1, dtype=np.int64)
+    np.cumsum(np.bincount(labels, minlength=n_lists), out=new_offsets[1:])
+    return {'centroids':    np.asarray(index['centroids']),
+            'list_offsets': new_offsets,
+            'list_rows':    np.argsort(labels, kind='stable').astype(np.int32)}
+
+
+def remove_from_ivf(index: dict, removed) -> dict:
+    """Drop catalog rows `removed` from the lists; later rows are renumbered."""
+    rows = np.asarray(index['list_rows'], dtype=np.int64)
+    offsets = np.asarray(index['list_offsets'])
+    keep = np.ones(len(rows), dtype=bool)
+    keep[np.asarray(removed, dtype=np.int64)] = False
+    labels = np.empty(len(rows), dtype=np.int32)
+    labels[rows] = np.repeat(np.arange(len(offsets) - 1, dtype=np.int32), np.diff(offsets))
+    labels = labels[keep]
+
+    n_lists = len(index['centroids'])
+    new_offsets = np.zeros(n_lists + 1, dtype=np.int64)
+    np.cumsum(np.bincount(labels, minlength=n_lists), out=new_offsets[1:])
+    return {'centroids':    np.asarray(index['centroids']),
+            'list_offsets': new_offsets,
+            'list_rows':    np.argsort(labels, kind='stable').astype(np.int32)}
@@ -1,8 +1,26 @@
 import streamlit as st
-import pandas as pd
-import joblib
-import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
+import json
+import os
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+
+import engine as recengine
+import instrument
+import media
+from cache import make_cache
+from model_bundle import MODEL_DIR, current_version
+from neighbors import new_library_scores
+from rerank import DEFAULT_BLEND
+
+# Set STEAMLENS_API_URL to use a running `service.py` instead of loading
+# the models into this Streamlit process
+API_URL = os.environ.get('STEAMLENS_API_URL', '').rstrip('/')
+# Optional SQLite file so several Streamlit servers share recommendation results
+CACHE_DB = os.environ.get('STEAMLENS_CACHE_DB')
+# Cards per "load more" page; the service caps `n` / `limit` at MAX_RESULTS
+SEARCH_PAGE = 5
+REC_PAGE    = 6
+MAX_RESULTS = 100
 
 # ─────────────────────────────────────────────
 # PAGE CONFIG
@@ -146,6 +164,10 @@ p, label, span { font-family: var(--font-body) !important; }
     box-shadow: 0 12px 40px rgba(102,192,244,0.12);
 }
 .rec-card-inner { padding: 12px; }
+.thumb-placeholder {
+    aspect-ratio: 460 / 215; display: flex; align-items: center; justify-content: center;
+    font-size: 2rem; opacity: 0.35; background: rgba(255,255,255,0.03); border-radius: var(--radius-sm);
+}
 .rec-title {
     font-family: var(--font-display); font-size: 0.95rem; font-weight: 600;
     color: var(--text-primary); margin: 8px 0 6px 0; line-height: 1.3;
@@ -228,16 +250,41 @@ label, .stSelectbox label, .stSlider label, .stTextInput label {
 
 
 # ─────────────────────────────────────────────
-# LOAD MODELS  (cached — loads once per session)
+# ENGINE  (local models, or the HTTP service when API_URL is set)
 # ─────────────────────────────────────────────
+@st.cache_resource(show_spinner=False, max_entries=2)
+def load_models(version: str = None):
+    """Cached per bundle version — reloads when models/CURRENT moves."""
+    return recengine.load_models(MODEL_DIR, version)
+
+@st.cache_resource(show_spinner=False)
+def result_cache():
+    """One candidate cache for every session of this server."""
+    return make_cache(CACHE_DB)
+
 @st.cache_resource(show_spinner=False)
-def load_models():
-    games        = joblib.load('games_data.pkl')
-    tfidf_matrix = joblib.load('tfidf_matrix.pkl')
-    return games, tfidf_matrix
+def thumbnails():
+    """One on-disk image cache and download pool for every session (see media.py)."""
+    return media.thumbnail_cache()
+
+def api(path: str, payload: dict = None, raw: bool = False):
+    data = json.dumps(payload).encode() if payload is not None else None
+    req  = Request(API_URL + path, data=data, headers={'Content-Type': 'application/json'})
+    with urlopen(req, timeout=30) as resp:
+        return resp.read().decode() if raw else json.load(resp)
+
+@st.cache_data(show_spinner=False, ttl=30)
+def api_info() -> dict:
+    return api('/info')
 
 with st.spinner("🎮  Loading AI engine…"):
-    games, tfidf_matrix = load_models()
+    if API_URL:
+        models = None
+        info   = api_info()
+    else:
+        models = load_models(current_version(MODEL_DIR))    # None version → legacy pickles
+        info   = recengine.info(models)
+model_version = info['version']
 
 if 'library' not in st.session_state:
     st.session_state.library = []
@@ -264,70 +311,79 @@ def price_badge(price: float) -> str:
         return '<span class="badge badge-free">Free</span>'
     return f'<span class="badge badge-price">${price:.2f}</span>'
 
-def steam_img(app_id) -> str:
-    return f"https://cdn.akamai.steamstatic.com/steam/apps/{int(app_id)}/header.jpg"
+def card_images(page: list, ahead: list) -> dict:
+    """
+    Images for the cards on screen (placeholder-able None when slow), while
+    the next page's images download in the background.
+    """
+    images = thumbnails().wait_for([row['app_id'] for row in page])
+    thumbnails().prefetch([row['app_id'] for row in ahead])
+    return images
+
+def show_thumbnail(image):
+    if image is None:
+        st.markdown('<div class="thumb-placeholder">🎮</div>', unsafe_allow_html=True)
+    else:
+        st.image(image, use_container_width=True)
+
+def paged(key: str, state, page_size: int) -> int:
+    """Cards shown for `key`; back to one page whenever `state` changes."""
+    if st.session_state.get(f'{key}_state') != state:
+        st.session_state[f'{key}_state'] = state
+        st.session_state[f'{key}_shown'] = page_size
+    return st.session_state[f'{key}_shown']
+
+def load_more(key: str, page_size: int):
+    if st.button("Load more", key=f'{key}_more'):
+        st.session_state[f'{key}_shown'] += page_size
+        st.rerun()
+
+def search_games(query: str, limit: int = 5) -> list:
+    if API_URL:
+        return api('/search?' + urlencode({'q': query, 'limit': limit}))['results']
+    return recengine.search(models, query, limit)
+
+def get_recommendations(library_titles: tuple, platform: str, budget: float, min_ratio: float,
+                        n: int = 6, engine: str = 'exact', weights: dict = None,
+                        blend: dict = None):
+    """
+    Library-centroid recommendations, from the service or the local engine.
+    Both cache a filter-independent candidate list per library set (see cache.py),
+    so reordering the library or moving a slider rarely re-scores the catalog.
+    """
+    if API_URL:
+        return api('/recommend', {'library': list(library_titles), 'platform': platform,
+                                  'budget': budget, 'min_ratio': min_ratio,
+                                  'n': n, 'engine': engine, 'weights': weights,
+                                  'blend': blend})['results']
+    return recengine.recommend(models, library_titles, platform, budget, min_ratio,
+                               n=n, engine=engine, cache=result_cache(), weights=weights, blend=blend)
+
 
-@st.cache_data(show_spinner=False, max_entries=200)
-def get_recommendations(_tfidf_matrix, library_titles: tuple,
-                         platform: str, budget: float, min_ratio: float,
-                         n: int = 6):
+def get_neighbor_recommendations(library_titles: tuple, platform: str,
+                                 budget: float, min_ratio: float, n: int = 6):
     """
-    On-the-fly cosine similarity for the library centroid.
-    Cached by (library, filters) — instant on repeated queries.
+    Neighbor-index mode: scores live in session state and are updated
+    incrementally as games are added. The service recomputes them per
+    request instead, so this path is local-only.
     """
-    # Build centroid of all library game vectors
-    idxs = []
-    for title in library_titles:
-        match = games[games['title'] == title]
-        if not match.empty:
-            idxs.append(match.index[0])
-
-    if not idxs:
-        return []
-
-    # Centroid vector across library
-    lib_matrix = _tfidf_matrix[idxs]           # shape (K, F)
-    centroid   = np.asarray(lib_matrix.mean(axis=0))  # shape (1, F) — plain array, not np.matrix
-
-    # Cosine similarity: one query against all 71K games
-    scores = cosine_similarity(centroid, _tfidf_matrix).flatten()  # shape (N,)
-
-    # Zero out library games themselves
-    for i in idxs:
-        scores[i] = -1
-
-    ranked  = scores.argsort()[::-1]
-    results = []
-
-    for idx in ranked:
-        g = games.iloc[idx]
-        plat_ok  = bool(g.get(platform, True))
-        price_ok = float(g['price_final']) <= budget
-        ratio_ok = float(g.get('positive_ratio', 0)) >= min_ratio
-        not_lib  = g['title'] not in library_titles
-
-        if plat_ok and price_ok and ratio_ok and not_lib:
-            results.append({
-                'idx':      idx,
-                'score':    float(scores[idx]),
-                'title':    g['title'],
-                'rating':   g['rating'],
-                'ratio':    float(g.get('positive_ratio', 0)),
-                'price':    float(g['price_final']),
-                'app_id':   g.get('app_id', 0),
-            })
-
-        if len(results) == n:
-            break
-
-    return results
+    if API_URL:
+        return get_recommendations(library_titles, platform, budget, min_ratio,
+                                   n=n, engine='neighbors')
+    if st.session_state.get('neighbor_version', '') != model_version:
+        st.session_state.neighbor_scores  = new_library_scores(info['n_games'])
+        st.session_state.neighbor_version = model_version
+    return recengine.recommend(models, library_titles, platform, budget, min_ratio, n=n,
+                               engine='neighbors', neighbor_state=st.session_state.neighbor_scores,
+                               cache=result_cache())
 
 
 # ─────────────────────────────────────────────
 # HERO HEADER
 # ─────────────────────────────────────────────
-free_pct  = int((games['price_final'] == 0).mean() * 100)
-avg_score = int(games['positive_ratio'].mean())
+free_pct  = info['free_pct']     # computed once per model load
+avg_score = info['avg_score']
+n_games   = info['n_games']
 
 st.markdown(f"""
 <div class="hero-wrap">
@@ -336,13 +392,13 @@ st.markdown(f"""
         <div class="hero-title">SteamLens</div>
         <div class="hero-sub">AI-Powered Game Discovery Engine</div>
     </div>
-    <div class="hero-badge">✦ {len(games):,} Games Indexed</div>
+    <div class="hero-badge">✦ {n_games:,} Games Indexed</div>
 </div>
 """, unsafe_allow_html=True)
 
 st.markdown(f"""
 <div class="stat-row">
-    <div class="stat-chip">🗄️ Dataset <strong>{len(games):,} games</strong></div>
+    <div class="stat-chip">🗄️ Dataset <strong>{n_games:,} games</strong></div>
     <div class="stat-chip">🆓 Free titles <strong>{free_pct}%</strong></div>
     <div class="stat-chip">⭐ Avg approval <strong>{avg_score}%</strong></div>
     <div class="stat-chip">🤖 Algorithm <strong>TF-IDF · On-the-Fly Cosine Similarity</strong></div>
@@ -367,6 +423,29 @@ with col_filters:
     budget    = st.slider("Max Price (USD)", 0, 100, 60, step=5)
     min_ratio = st.slider("Min Approval %",  0, 100, 50, step=5)
 
+    engine_labels = {"exact": "Exact", "neighbors": "Neighbor index", "ann": "ANN (embeddings)"}
+    engine_map    = {engine_labels[e]: e for e in info['engines']}
+    engine = engine_map[st.selectbox("Engine", list(engine_map.keys()))]
+
+    # Field-model bundles: re-weight title / rating / price / platforms per query
+    weights = None
+    if info.get('fields'):
+        with st.expander("Field weights"):
+            chosen = {field: st.slider(field.replace('_', ' ').title(), 0.0, 2.0, float(default), step=0.05)
+                      for field, default in info['fields'].items()}
+        if chosen != info['fields']:
+            weights = chosen
+
+    # Second stage: re-rank the top candidates by quality, popularity and price fit
+    blend = None
+    with st.expander("Ranking"):
+        if st.checkbox("Blend in quality & popularity"):
+            blend = {key: st.slider(label, 0.0, maximum, float(DEFAULT_BLEND[key]), step=0.05)
+                     for key, label, maximum in (('quality', 'Quality', 1.0),
+                                                 ('popularity', 'Popularity', 1.0),
+                                                 ('price', 'Price fit', 1.0),
+                                                 ('diversity', 'Diversity', 0.9))}
+
     st.markdown('</div>', unsafe_allow_html=True)
 
 with col_search:
@@ -378,32 +457,32 @@ with col_search:
     )
 
     if query:
-        results = games[games['title'].str.contains(query, case=False, na=False)].head(5)
+        shown   = paged('search', query, SEARCH_PAGE)
+        results = search_games(query, limit=min(shown + SEARCH_PAGE, MAX_RESULTS))  # one page ahead
+        results, ahead = results[:shown], results[shown:]
 
-        if results.empty:
+        if not results:
             st.markdown("""
             <div class="empty-state">
                 <div class="empty-icon">🔭</div>
                 <div class="empty-text">No games found.<br>Try a different search term.</div>
             </div>""", unsafe_allow_html=True)
         else:
-            for _, row in results.iterrows():
+            images = card_images(results, ahead)
+            for row in results:
                 st.markdown('<div class="result-card">', unsafe_allow_html=True)
                 c_img, c_info, c_btn = st.columns([1.4, 3, 1])
 
                 with c_img:
-                    try:
-                        st.image(steam_img(row['app_id']), use_container_width=True)
-                    except:
-                        st.markdown('<div style="font-size:2rem;text-align:center;padding:1rem">🎮</div>', unsafe_allow_html=True)
+                    show_thumbnail(images[int(row['app_id'])])
 
                 with c_info:
                     st.markdown(f"""
                     <div class="card-title">{row['title']}</div>
                     <div class="card-meta">
                         {rating_badge(row['rating'])}
-                        {price_badge(row['price_final'])}
-                        <span style="color:var(--text-muted)">👍 {int(row.get('positive_ratio',0))}%</span>
+                        {price_badge(row['price'])}
+                        <span style="color:var(--text-muted)">👍 {int(row['ratio'])}%</span>
                     </div>
                     """, unsafe_allow_html=True)
 
@@ -418,6 +497,9 @@ with col_search:
 
                 st.markdown('</div>', unsafe_allow_html=True)
 
+            if ahead:
+                load_more('search', SEARCH_PAGE)
+
 
 # ─────────────────────────────────────────────
 # DIVIDER
@@ -461,12 +543,20 @@ with col_rec:
     st.markdown('<div class="section-label">✦ Recommended For You</div>', unsafe_allow_html=True)
 
     if st.session_state.library:
+        shown = paged('recs', (tuple(st.session_state.library), platform, budget, min_ratio,
+                               engine, json.dumps(weights), json.dumps(blend)), REC_PAGE)
+        n = min(shown + REC_PAGE, MAX_RESULTS)          # one page ahead, for prefetch and "load more"
         with st.spinner("⚡ Computing recommendations across 71,000 games…"):
-            recs = get_recommendations(
-                tfidf_matrix,
-                tuple(st.session_state.library),   # hashable for cache
-                platform, budget, min_ratio, n=6
-            )
+            if engine == "neighbors" and weights is None and blend is None:
+                recs = get_neighbor_recommendations(
+                    tuple(st.session_state.library), platform, budget, min_ratio, n=n
+                )
+            else:
+                recs = get_recommendations(
+                    tuple(st.session_state.library),   # hashable for cache
+                    platform, budget, min_ratio, n=n, engine=engine, weights=weights, blend=blend
+                )
+        recs, ahead = recs[:shown], recs[shown:]
 
         if not recs:
             st.markdown("""
@@ -475,16 +565,14 @@ with col_rec:
                 <div class="empty-text">No matches with current filters.<br>Try relaxing Price or Approval % sliders.</div>
             </div>""", unsafe_allow_html=True)
         else:
+            images = card_images(recs, ahead)
             grid = st.columns(3)
             for i, rec in enumerate(recs):
                 with grid[i % 3]:
-                    bar_w = max(4, int(rec['score'] * 100))
+                    bar_w = max(4, int(rec['similarity'] * 100))   # score is the blend when re-ranking
 
                     st.markdown('<div class="rec-card">', unsafe_allow_html=True)
-                    try:
-                        st.image(steam_img(rec['app_id']), use_container_width=True)
-                    except:
-                        pass
+                    show_thumbnail(images[int(rec['app_id'])])
 
                     st.markdown(f"""
                     <div class="rec-card-inner">
@@ -494,7 +582,7 @@ with col_rec:
                         </div>
                         <div class="rec-bar-label">
                             <span>Match</span>
-                            <span style="color:var(--blue);font-weight:600">{rec['score']:.1%}</span>
+                            <span style="color:var(--blue);font-weight:600">{rec['similarity']:.1%}</span>
                         </div>
                         <div class="card-meta">
                             {rating_badge(rec['rating'])}
@@ -503,6 +591,8 @@ with col_rec:
                     </div>
                     """, unsafe_allow_html=True)
                     st.markdown('</div>', unsafe_allow_html=True)
+            if ahead:
+                load_more('recs', REC_PAGE)
     else:
         st.markdown("""
         <div class="empty-state" style="padding:5rem 2rem">
@@ -510,4 +600,27 @@ with col_rec:
             <div class="empty-text" style="font-size:0.9rem">
                 Add at least one game to your library<br>to activate the AI recommendation engine.
             </div>
-        </div>""", unsafe_allow_html=True)
\ No newline at end of file
+        </div>""", unsafe_allow_html=True)
+
+
+# ─────────────────────────────────────────────
+# DEBUG PANEL  (STEAMLENS_METRICS=1)
+# ─────────────────────────────────────────────
+if instrument.enabled():
+    with st.sidebar:
+        st.markdown('<div class="section-label">⏱ Debug</div>', unsafe_allow_html=True)
+        if API_URL:
+            st.code(api('/metrics', raw=True), language=None)
+        else:
+            last = instrument.last_request()     # most recent request of this server process
+            if last:
+                st.caption(f"Last {last['request']} · {last['total_ms']:.1f} ms")
+                st.dataframe([{'stage': k, 'ms': round(v, 3)} for k, v in last['stages'].items()],
+                             hide_index=True)
+                st.json(last['counters'])
+            st.caption("Result cache")
+            st.json(result_cache().stats())
+            with st.expander("Totals (Prometheus)"):
+                st.code(instrument.prometheus_text(), language=None)
+        st.caption("Thumbnails")
+        st.json(thumbnails().stats())
@@ -0,0 +1,357 @@
+"""
+Reproducible latency benchmark for the recommender hot path.
+
+Generates a synthetic catalog shaped like `games.csv` (same columns,
+Zipf-distributed title vocabulary, Steam-like rating / price / platform
+mix), builds the bundle through `pipeline` and `model_bundle` exactly as
+the notebook does, then measures:
+
+- cold `engine.load_models` in a fresh interpreter
+- title search
+- single recommendations (exact / neighbors / ann) across filter
+  selectivities and library sizes, uncached — p50 / p95 / p99
+- batch scoring with `recommend_batch` (queries per second)
+- serving memory: RSS of a fresh interpreter after loading the bundle
+  and at its peak over a round of searches and recommendations
+
+Results are written as JSON and can be compared against a stored baseline;
+any latency more than `--tolerance` slower than the baseline fails the run.
+
+    python benchmark.py --sizes 10k 71k --out bench.json
+    python benchmark.py --sizes 71k --save-baseline bench_baseline.json
+    python benchmark.py --sizes 71k --baseline bench_baseline.json
+
+The exact neighbor table build is quadratic in the catalog size, so it is
+skipped by default above NEIGHBOR_AUTO_MAX games (pass `--neighbor-k 50`
+to build it anyway, e.g. for 500k; expect hours).
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import ann
+import engine
+import features
+import model_bundle
+import neighbors
+import pipeline
+import rerank
+from recommender import recommend_batch
+from search import build_search_index
+
+SIZES = {'10k': 10_000, '71k': 71_000, '500k': 500_000, '2m': 2_000_000}
+NEIGHBOR_K        = 50
+NEIGHBOR_AUTO_MAX = 100_000     # larger catalogs skip the neighbor table unless --neighbor-k is given
+SELECTIVITY = {                 # (platform, max price, min approval %)
+    'loose':  ('win',   100, 0),
+    'medium': ('win',    30, 70),
+    'strict': ('linux',  10, 90),
+}
+LIBRARY_SIZES = (1, 5, 20)
+RATINGS = ['Overwhelmingly Positive', 'Very Positive', 'Positive', 'Mostly Positive',
+           'Mixed', 'Mostly Negative', 'Negative', 'Very Negative', 'Overwhelmingly Negative']
+RATING_P = [0.03, 0.12, 0.30, 0.20, 0.22, 0.06, 0.04, 0.02, 0.01]
+PRICES   = [0, 0.99, 1.99, 4.99, 9.99, 14.99, 19.99, 29.99, 39.99, 59.99, 69.99]
+PRICES_P = [0.12, 0.08, 0.10, 0.18, 0.20, 0.10, 0.09, 0.06, 0.03, 0.03, 0.01]
+
+
+# ─────────────────────────────────────────────
+# SYNTHETIC CATALOG
+# ─────────────────────────────────────────────
+def _vocabulary(rng, size: int = 20_000) -> np.ndarray:
+    syllables = np.array(['ka', 'ro', 'mi', 'tan', 'el', 'dor', 'vex', 'su', 'ny', 'gal',
+                          'tor', 'ra', 'zen', 'li', 'os', 'quar', 'ith', 'mo', 'bel', 'un'])
+    parts = rng.integers(0, len(syllables), size=(size, 3))
+    lens  = rng.integers(1, 4, size=size)
+    words = [''.join(syllables[p[:k]]) for p, k in zip(parts, lens)]
+    return np.array(list(dict.fromkeys(words)))
+
+
+def synthetic_games(n: int, seed: int = 42) -> pd.DataFrame:
+    """A `games.csv`-shaped frame of `n` rows."""
+    rng   = np.random.default_rng(seed)
+    vocab = _vocabulary(rng)
+    ranks = np.minimum(rng.zipf(1.3, size=(n, 5)) - 1, len(vocab) - 1)
+    n_words = rng.integers(1, 6, size=n)
+    titles = [' '.join(vocab[r[:k]]).title() for r, k in zip(ranks, n_words)]
+    sequel = rng.random(n) < 0.15
+    titles = np.where(sequel, [f'{t} {k}' for t, k in zip(titles, rng.integers(2, 6, size=n))], titles)
+
+    price = rng.choice(PRICES, size=n, p=PRICES_P)
+    return pd.DataFrame({
+        'app_id':         rng.permutation(np.arange(10, 10 * (4 * n + 10), 10))[:n],
+        'title':          titles,
+        'date_release':   '2020-01-01',
+        'win':            rng.random(n) < 0.98,
+        'mac':            rng.random(n) < 0.25,
+        'linux':          rng.random(n) < 0.18,
+        'rating':         rng.choice(RATINGS, size=n, p=RATING_P),
+        'positive_ratio': rng.integers(0, 101, size=n),
+        'user_reviews':   np.minimum(rng.zipf(1.6, size=n) * 10, 10_000_000),
+        'price_final':    price,
+        'price_original': price,
+        'discount':       0.0,
+        'steam_deck':     True,
+    })
+
+
+def build_catalog(n: int, workdir: str, neighbor_k: int = NEIGHBOR_K, with_ann: bool = True,
+                  n_jobs: int = None, feature_model: str = 'text', values: str = 'float32') -> dict:
+    """Write the synthetic CSV and build its bundle under `workdir`; returns build timings."""
+    os.makedirs(workdir, exist_ok=True)
+    csv_path, root = os.path.join(workdir, 'games.csv'), os.path.join(workdir, 'models')
+    timings = {}
+
+    t0 = time.perf_counter()
+    synthetic_games(n).to_csv(csv_path, index=False)
+    timings['generate_s'] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    stats = pipeline.scan_games_csv(csv_path)
+    games = pipeline.load_games(csv_path, stats)
+    arrays = rerank.prior_arrays(rerank.build_priors(games))
+    if feature_model == 'fields':
+        vectorizer, tfidf_matrix = features.fit_fields(games)
+        arrays.update(features.field_arrays(vectorizer, tfidf_matrix))
+    else:
+        vectorizer, tfidf_matrix = pipeline.fit_tfidf(games, n_jobs=n_jobs)
+    timings['tfidf_s'] = time.perf_counter() - t0
+    timings['nnz'] = int(tfidf_matrix.nnz)
+
+    if neighbor_k:
+        t0 = time.perf_counter()
+        arrays.update(neighbors.table_arrays(*neighbors.build_neighbor_table(tfidf_matrix, k=neighbor_k)))
+        timings['neighbors_s'] = time.perf_counter() - t0
+    if with_ann:
+        t0 = time.perf_counter()
+        emb, components = ann.build_embeddings(tfidf_matrix)
+        arrays.update(ann.ann_arrays(emb, components, ann.build_ivf(emb)))
+        timings['ann_s'] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    model_bundle.write_bundle(root, tfidf_matrix, games, vectorizer=vectorizer,
+                              search_index=build_search_index(games['title']), arrays=arrays,
+                              extra={'cleaning': pipeline.cleaning_params(stats)}, values=values)
+    timings['write_s'] = time.perf_counter() - t0
+    return timings
+
+
+# ─────────────────────────────────────────────
+# MEASUREMENTS
+# ─────────────────────────────────────────────
+def percentiles(samples_s) -> dict:
+    """p50 / p95 / p99 / mean of `samples_s` (seconds), in milliseconds."""
+    ms = 1e3 * np.asarray(samples_s, dtype=np.float64)
+    return {'p50_ms': float(np.percentile(ms, 50)), 'p95_ms': float(np.percentile(ms, 95)),
+            'p99_ms': float(np.percentile(ms, 99)), 'mean_ms': float(ms.mean()), 'n': int(ms.size)}
+
+
+def _timed(fn, args_list) -> dict:
+    fn(*args_list[0])                       # warm-up, not counted
+    samples = []
+    for args in args_list:
+        t0 = time.perf_counter()
+        fn(*args)
+        samples.append(time.perf_counter() - t0)
+    return percentiles(samples)
+
+
+def cold_load(root: str, repeats: int = 3) -> dict:
+    """`engine.load_models` in a fresh interpreter (imports excluded)."""
+    code = ('import time, engine; t0 = time.perf_counter(); '
+            f'engine.load_models({root!r}); print(time.perf_counter() - t0)')
+    here = os.path.dirname(os.path.abspath(__file__))
+    samples = [float(subprocess.run([sys.executable, '-c', code], cwd=here, check=True,
+                                    capture_output=True, text=True).stdout.split()[-1])
+               for _ in range(repeats)]
+    return percentiles(samples)
+
+
+SERVING_RSS_CODE = '''
+import resource, sys, numpy as np, engine
+def rss_mb():
+    with open('/proc/self/status') as f:
+        return next(int(l.split()[1]) for l in f if l.startswith('VmRSS')) / 1024
+models = engine.load_models(sys.argv[1])
+after_load = rss_mb()
+rng    = np.random.default_rng(0)
+titles = models['games']['title'].astype(str).to_numpy()
+for _ in range(int(sys.argv[2])):
+    lib = tuple(rng.choice(titles, size=5, replace=False))
+    engine.search(models, lib[0][:4])
+    for eng in models['engines']:
+        engine.recommend(models, lib, 'win', 60, 50, n=12, engine=eng)
+print(after_load, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024)
+'''
+
+
+def serving_rss(root: str, queries: int = 50) -> dict:
+    """
+    Memory of a fresh interpreter that only loads the bundle and serves
+    `queries` rounds of requests — not of this process, which built it.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    out  = subprocess.run([sys.executable, '-c', SERVING_RSS_CODE, root, str(queries)], cwd=here,
+                          check=True, capture_output=True, text=True).stdout.split()
+    return {'after_load_mb': float(out[-2]), 'peak_mb': float(out[-1])}
+
+
+def bench_catalog(root: str, queries: int = 200, seed: int = 0) -> dict:
+    """Every hot-path measurement against the bundle at `root`."""
+    rng    = np.random.default_rng(seed)
+    models = engine.load_models(root)
+    titles = models['games']['title'].astype(str).to_numpy()
+    X      = models['tfidf_matrix']
+    result = {'n_games': len(titles), 'n_features': int(X.shape[1]),
+              'matrix_mb': (X.data.nbytes + X.indices.nbytes + X.indptr.nbytes) / 1e6,
+              'cold_load': cold_load(root)}
+
+    # Title search: full titles, prefixes and inner substrings
+    picks = rng.choice(titles, size=queries)
+    cuts  = [t[:max(3, len(t) // 2)] for t in picks]
+    inner = [t[len(t) // 3:len(t) // 3 + 4] for t in picks]
+    result['search'] = {
+        'title':     _timed(lambda q: engine.search(models, q), [(q,) for q in picks]),
+        'prefix':    _timed(lambda q: engine.search(models, q), [(q,) for q in cuts]),
+        'substring': _timed(lambda q: engine.search(models, q), [(q,) for q in inner]),
+    }
+
+    # Single recommendations, uncached, per engine × selectivity × library size
+    single = {}
+    per_case = max(20, queries // (len(SELECTIVITY) * len(LIBRARY_SIZES)))
+    for eng in models['engines']:
+        for sel, (plat, price, ratio) in SELECTIVITY.items():
+            for size in LIBRARY_SIZES:
+                libs = [tuple(rng.choice(titles, size=size, replace=False)) for _ in range(per_case)]
+                single[f'{eng}/{sel}/lib{size}'] = _timed(
+                    lambda lib: engine.recommend(models, lib, plat, price, ratio, n=6, engine=eng),
+                    [(lib,) for lib in libs])
+    result['recommend'] = single
+
+    # Two-stage recommendations: exact retrieval + blended re-rank (plain / MMR)
+    libs = [tuple(rng.choice(titles, size=5, replace=False)) for _ in range(per_case)]
+    result['rerank'] = {
+        name: _timed(lambda lib: engine.recommend(models, lib, n=6, blend=blend), [(lib,) for lib in libs])
+        for name, blend in (('blend', {}), ('mmr', {'diversity': 0.3}))}
+
+    # Batch scoring: one single-game query per row, blocked sparse × dense
+    rows = rng.choice(X.shape[0], size=min(1024, X.shape[0]), replace=False)
+    t0 = time.perf_counter()
+    recommend_batch(X, rows, k=10, normalized=models['normalized'])
+    elapsed = time.perf_counter() - t0
+    result['batch'] = {'queries': int(rows.size), 'total_s': elapsed,
+                       'qps': rows.size / elapsed, 'per_query_ms': 1e3 * elapsed / rows.size}
+
+    result['serving_rss'] = serving_rss(root)
+    return result
+
+
+# ─────────────────────────────────────────────
+# BASELINE COMPARISON
+# ─────────────────────────────────────────────
+GATE_KEYS = ('p50_ms', 'per_query_ms')
+
+
+def _latencies(report: dict, keys, prefix: str = '') -> dict:
+    """Flatten the `keys` latency figures of `report` to {'path/key': value}."""
+    out = {}
+    for key, value in report.items():
+        path = f'{prefix}/{key}' if prefix else key
+        if isinstance(value, dict):
+            out.update(_latencies(value, keys, path))
+        elif key in keys:
+            out[path] = float(value)
+    return out
+
+
+def compare(report: dict, baseline: dict, tolerance: float = 0.25, floor_ms: float = 1.0,
+            keys=GATE_KEYS) -> list:
+    """
+    Latencies slower than the baseline by more than `tolerance` (relative).
+    Only `keys` are gated — tails (p95 / p99) of small samples are noisy —
+    and figures under `floor_ms` in both runs are ignored as timer noise.
+    """
+    now  = _latencies(report['catalogs'], keys)
+    base = _latencies(baseline['catalogs'], keys)
+    regressions = []
+    for path, value in sorted(now.items()):
+        ref = base.get(path)
+        if ref is None or max(value, ref) < floor_ms:
+            continue
+        if value > ref * (1 + tolerance):
+            regressions.append({'metric': path, 'baseline_ms': ref, 'current_ms': value,
+                                'ratio': value / max(ref, 1e-9)})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark SteamLens load / search / recommend latency')
+    parser.add_argument('--sizes', nargs='+', default=['10k'], choices=list(SIZES))
+    parser.add_argument('--workdir', default='bench', help='where synthetic catalogs are built')
+    parser.add_argument('--queries', type=int, default=200, help='queries per measurement group')
+    parser.add_argument('--neighbor-k', type=int, default=None,
+                        help=f'0 skips the neighbor table (default: {NEIGHBOR_K} up to '
+                             f'{NEIGHBOR_AUTO_MAX:,} games, skipped above)')
+    parser.add_argument('--no-ann', action='store_true', help='skip the ANN index')
+    parser.add_argument('--jobs', type=int, default=None, help='processes for the TF-IDF build')
+    parser.add_argument('--feature-model', choices=('text', 'fields'), default='text',
+                        help='one TF-IDF string per game or weighted field blocks')
+    parser.add_argument('--values', choices=model_bundle.MATRIX_VALUES, default='float32',
+                        help='matrix storage of the built bundles')
+    parser.add_argument('--reuse', action='store_true', help='reuse catalogs already built in --workdir')
+    parser.add_argument('--out', default=None, help='write the JSON report here')
+    parser.add_argument('--baseline', default=None, help='compare against this JSON report')
+    parser.add_argument('--save-baseline', default=None, help='also write the report as a baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed relative slowdown')
+    parser.add_argument('--gate', nargs='+', default=list(GATE_KEYS),
+                        choices=['p50_ms', 'p95_ms', 'p99_ms', 'mean_ms', 'per_query_ms'],
+                        help='latency figures checked against the baseline')
+    args = parser.parse_args()
+
+    report = {'meta': {'python': platform.python_version(), 'numpy': np.__version__,
+                       'machine': platform.machine(), 'cpus': os.cpu_count(),
+                       'created': time.strftime('%Y-%m-%dT%H:%M:%S')},
+              'catalogs': {}}
+    for size in args.sizes:
+        workdir = os.path.join(args.workdir, size)
+        root    = os.path.join(workdir, 'models')
+        build   = None
+        if not (args.reuse and model_bundle.current_version(root)):
+            neighbor_k = args.neighbor_k
+            if neighbor_k is None:
+                neighbor_k = NEIGHBOR_K if SIZES[size] <= NEIGHBOR_AUTO_MAX else 0
+            print(f' Building {size} catalog{"" if neighbor_k else " (no neighbor table)"}…')
+            build = build_catalog(SIZES[size], workdir, neighbor_k, not args.no_ann, args.jobs,
+                                  args.feature_model, args.values)
+        print(f' Benchmarking {size}…')
+        report['catalogs'][size] = {**bench_catalog(os.path.abspath(root), args.queries),
+                                    'build': build}
+
+    text = json.dumps(report, indent=2)
+    for path in (args.out, args.save_baseline):
+        if path:
+            with open(path, 'w') as f:
+                f.write(text)
+    if not args.out:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance, keys=args.gate)
+        for r in regressions:
+            print(f' REGRESSION {r["metric"]}: {r["baseline_ms"]:.2f} → {r["current_ms"]:.2f} ms '
+                  f'(×{r["ratio"]:.2f})')
+        if regressions:
+            sys.exit(1)
+        print(f' No regressions beyond {args.tolerance:.0%} of {args.baseline}')
+
+
+if __name__ == '__main__':
+    main()
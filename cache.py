@@ -0,0 +1,195 @@
+"""
+Bounded cache of per-library recommendation candidates.
+
+Entries are keyed on the canonical library state — model version, engine
+and the *sorted set* of library rows — so the same games added in any
+order share one entry. Each entry holds a filter-independent top-M
+candidate list (library rows excluded, no platform / price / ratio
+filter); `engine.recommend` applies the filters on top, so moving a slider
+reuses the entry instead of re-scoring the catalog.
+
+`ResultCache` keeps entries in process memory; `SQLiteResultCache` keeps
+them in a local SQLite file that several workers (service processes,
+Streamlit servers on one host) read and fill together. Both evict least
+recently used entries past `max_bytes` and drop entries older than `ttl`
+seconds, and count hits, misses and evictions.
+"""
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+DEFAULT_TOP_M     = 500
+DEFAULT_MAX_BYTES = 64 << 20
+DEFAULT_TTL       = 3600.0
+ENTRY_OVERHEAD    = 200          # approx. bytes of key + bookkeeping per entry
+
+
+def cache_key(version, engine: str, rows) -> str:
+    """Canonical key: model version, engine and a digest of the sorted row set."""
+    rows = np.unique(np.asarray(list(rows), dtype=np.int64))
+    return f'{version}:{engine}:{hashlib.blake2b(rows.tobytes(), digest_size=16).hexdigest()}'
+
+
+def _entry_bytes(rows: np.ndarray, scores: np.ndarray) -> int:
+    return rows.nbytes + scores.nbytes + ENTRY_OVERHEAD
+
+
+# ─────────────────────────────────────────────
+# IN-PROCESS LRU
+# ─────────────────────────────────────────────
+class ResultCache:
+    """LRU + TTL cache of `(rows, scores)` candidate lists under a byte budget."""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, ttl: float = DEFAULT_TTL,
+                 top_m: int = DEFAULT_TOP_M):
+        self.max_bytes = int(max_bytes)
+        self.ttl       = float(ttl)
+        self.top_m     = int(top_m)
+        self.counters  = {'hits': 0, 'misses': 0, 'evictions': 0, 'expired': 0}
+        self._lock     = threading.Lock()
+        self._entries  = OrderedDict()          # key → (expires, rows, scores, nbytes)
+        self._bytes    = 0
+
+    def get(self, key: str):
+        """`(rows, scores)` for `key`, or None (counted as a miss)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.time():
+                self._drop(key)
+                self.counters['expired'] += 1
+                entry = None
+            if entry is None:
+                self.counters['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.counters['hits'] += 1
+            return entry[1], entry[2]
+
+    def put(self, key: str, rows: np.ndarray, scores: np.ndarray):
+        rows   = np.ascontiguousarray(rows, dtype=np.int32)
+        scores = np.ascontiguousarray(scores, dtype=np.float32)
+        nbytes = _entry_bytes(rows, scores)
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.time() + self.ttl, rows, scores, nbytes)
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.counters['evictions'] += 1
+
+    def _drop(self, key: str):
+        self._bytes -= self._entries.pop(key)[3]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        """Counters plus current size and hit rate."""
+        with self._lock:
+            entries, nbytes = len(self._entries), self._bytes
+        return self._stats(entries, nbytes)
+
+    def _stats(self, entries: int, nbytes: int) -> dict:
+        lookups = self.counters['hits'] + self.counters['misses']
+        return {**self.counters, 'entries': entries, 'bytes': nbytes,
+                'max_bytes': self.max_bytes, 'top_m': self.top_m,
+                'hit_rate': self.counters['hits'] / lookups if lookups else 0.0}
+
+
+# ─────────────────────────────────────────────
+# SHARED SQLITE STORE
+# ─────────────────────────────────────────────
+class SQLiteResultCache(ResultCache):
+    """
+    The same policy over a SQLite file shared by every process on the host.
+
+    Sizes and entries are global; hit / miss / eviction counters are this
+    process's view.
+    """
+
+    SCHEMA = ('CREATE TABLE IF NOT EXISTS results ('
+              'key TEXT PRIMARY KEY, expires REAL, used REAL, nbytes INTEGER, '
+              'rows BLOB, scores BLOB)')
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_MAX_BYTES,
+                 ttl: float = DEFAULT_TTL, top_m: int = DEFAULT_TOP_M):
+        super().__init__(max_bytes, ttl, top_m)
+        self.path   = path
+        self._local = threading.local()
+        with self._db() as db:
+            db.execute(self.SCHEMA)
+            db.execute('CREATE INDEX IF NOT EXISTS results_used ON results (used)')
+
+    def _db(self) -> sqlite3.Connection:
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=10)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            self._local.db = db
+        return db
+
+    def get(self, key: str):
+        now = time.time()
+        with self._db() as db:
+            row = db.execute('SELECT expires, rows, scores FROM results WHERE key = ?',
+                             (key,)).fetchone()
+            if row is not None and row[0] < now:
+                db.execute('DELETE FROM results WHERE key = ?', (key,))
+                row = None
+                with self._lock:
+                    self.counters['expired'] += 1
+            if row is not None:
+                db.execute('UPDATE results SET used = ? WHERE key = ?', (now, key))
+        with self._lock:
+            self.counters['hits' if row is not None else 'misses'] += 1
+        if row is None:
+            return None
+        return np.frombuffer(row[1], dtype=np.int32), np.frombuffer(row[2], dtype=np.float32)
+
+    def put(self, key: str, rows: np.ndarray, scores: np.ndarray):
+        rows   = np.ascontiguousarray(rows, dtype=np.int32)
+        scores = np.ascontiguousarray(scores, dtype=np.float32)
+        nbytes = _entry_bytes(rows, scores)
+        if nbytes > self.max_bytes:
+            return
+        now = time.time()
+        with self._db() as db:
+            db.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)',
+                       (key, now + self.ttl, now, nbytes, rows.tobytes(), scores.tobytes()))
+            db.execute('DELETE FROM results WHERE expires < ?', (now,))
+            total = db.execute('SELECT COALESCE(SUM(nbytes), 0) FROM results').fetchone()[0]
+            if total > self.max_bytes:
+                evicted = 0
+                for old_key, size in db.execute(
+                        'SELECT key, nbytes FROM results ORDER BY used').fetchall():
+                    if total <= self.max_bytes:
+                        break
+                    db.execute('DELETE FROM results WHERE key = ?', (old_key,))
+                    total   -= size
+                    evicted += 1
+                with self._lock:
+                    self.counters['evictions'] += evicted
+
+    def clear(self):
+        with self._db() as db:
+            db.execute('DELETE FROM results')
+
+    def stats(self) -> dict:
+        entries, nbytes = self._db().execute(
+            'SELECT COUNT(*), COALESCE(SUM(nbytes), 0) FROM results').fetchone()
+        return self._stats(entries, nbytes)
+
+
+def make_cache(path: str = None, **kwargs) -> ResultCache:
+    """A shared SQLite cache at `path`, or an in-process one when `path` is empty."""
+    return SQLiteResultCache(path, **kwargs) if path else ResultCache(**kwargs)
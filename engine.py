@@ -0,0 +1,347 @@
+"""
+Recommendation engine shared by the Streamlit app and the HTTP service.
+
+`load_models` gathers every model artifact into one dict; `search`,
+`recommend` and `recommend_many` take that dict and return plain,
+JSON-ready game records, so callers never touch the matrices directly.
+"""
+import os
+
+import joblib
+import numpy as np
+from sklearn.metrics.pairwise import cosine_similarity
+
+import features
+import instrument
+from ann import ann_from_bundle, ann_search
+from cache import cache_key
+from instrument import count, stage
+from model_bundle import MODEL_DIR, current_version, load_bundle
+from neighbors import (neighbor_scores, neighbor_top_n, new_library_scores,
+                       sync_library_scores, table_from_bundle)
+from rerank import (RERANK_DEPTH, blend_weights, build_priors, priors_from_bundle,
+                    rerank)
+from recommender import (build_filter_arrays, build_lookup, candidate_mask,
+                         owned_rows, title_rows, top_n)
+from search import build_search_index, search_titles
+
+ENGINES = ('exact', 'neighbors', 'ann')
+
+
+# ─────────────────────────────────────────────
+# LOADING
+# ─────────────────────────────────────────────
+def catalog_stats(games) -> dict:
+    """Header figures for the UI, computed once per model load."""
+    return {'n_games':   len(games),
+            'free_pct':  int((games['price_final'] == 0).mean() * 100),
+            'avg_score': int(games['positive_ratio'].mean())}
+
+
+def load_models(root: str = MODEL_DIR, version: str = None) -> dict:
+    """
+    Load bundle `version` (CURRENT by default) from `root`, or the legacy
+    pickle export in the working directory when no bundle is published.
+    """
+    version = version or current_version(root)
+    if version:                                 # memory-mapped bundle
+        bundle = load_bundle(root, version)
+        games  = bundle['games']
+        models = {'games':          games,
+                  'tfidf_matrix':   bundle['tfidf_matrix'],
+                  'lookup':         bundle['lookup'],
+                  'search_index':   bundle['search_index'],
+                  'neighbor_table': table_from_bundle(bundle),
+                  'ann_engine':     ann_from_bundle(bundle),
+                  'fields':         features.fields_from_bundle(bundle),
+                  'priors':         priors_from_bundle(bundle),
+                  'normalized':     bundle['manifest']['tfidf']['normalized']}
+    else:                                       # legacy pickle export
+        games = joblib.load('games_data.pkl')
+        if os.path.exists('lookup_index.pkl'):
+            lookup = joblib.load('lookup_index.pkl')
+        else:
+            lookup = build_lookup(games)
+        if os.path.exists('search_index.pkl'):
+            search_index = joblib.load('search_index.pkl')
+        else:
+            search_index = build_search_index(games['title'])
+        models = {'games':          games,
+                  'tfidf_matrix':   joblib.load('tfidf_matrix.pkl'),
+                  'lookup':         lookup,
+                  'search_index':   search_index,
+                  'neighbor_table': None,
+                  'ann_engine':     None,
+                  'fields':         None,
+                  'priors':         None,
+                  'normalized':     False}
+
+    models['version'] = version
+    models['filters'] = build_filter_arrays(games)      # platform / price / ratio arrays
+    models['stats']   = catalog_stats(games)
+    if models['priors'] is None:                        # bundles written before priors were stored
+        models['priors'] = build_priors(games)
+    models['engines'] = [e for e in ENGINES if e == 'exact'
+                         or (e == 'neighbors' and models['neighbor_table'] is not None)
+                         or (e == 'ann' and models['ann_engine'] is not None)]
+    return models
+
+
+def info(models: dict) -> dict:
+    """Version, available engines, default field weights and header stats of the loaded models."""
+    fields = models['fields']
+    weights = dict(zip(fields['names'], fields['weights'].tolist())) if fields is not None else None
+    return {'version': models['version'], 'engines': models['engines'], 'fields': weights,
+            **models['stats']}
+
+
+# ─────────────────────────────────────────────
+# RESULTS
+# ─────────────────────────────────────────────
+def records(models: dict, rows, scores=None, similarity=None) -> list:
+    """
+    JSON-ready game records for catalog `rows`. With `scores`, each record
+    gets `score` (the ranking score) and `similarity` (the cosine match,
+    `scores` itself unless a re-rank blended it).
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    page = models['games'].iloc[rows]
+    none = np.zeros(len(rows))
+    title, rating = page['title'].astype(str).tolist(), page['rating'].astype(str).tolist()
+    price  = page['price_final'].to_numpy(dtype=np.float64).round(2)     # float32 storage → cents
+    ratio  = page['positive_ratio'].to_numpy(dtype=np.float64) if 'positive_ratio' in page else none
+    app_id = page['app_id'].to_numpy(dtype=np.int64) if 'app_id' in page else none.astype(np.int64)
+    out = []
+    for i, row in enumerate(rows):
+        rec = {'idx': int(row), 'title': title[i], 'rating': rating[i],
+               'ratio': float(ratio[i]), 'price': float(price[i]), 'app_id': int(app_id[i])}
+        if scores is not None:
+            rec['score']      = float(scores[i])
+            rec['similarity'] = float(similarity[i] if similarity is not None else scores[i])
+        out.append(rec)
+    return out
+
+
+# ─────────────────────────────────────────────
+# QUERIES
+# ─────────────────────────────────────────────
+@instrument.traced('search')
+def search(models: dict, query: str, limit: int = 5) -> list:
+    """Title search: exact, then prefix, then substring matches."""
+    with stage('search_index'):
+        rows = search_titles(models['search_index'], query, limit=limit)
+    with stage('records'):
+        return records(models, rows)
+
+
+def _library_state(models: dict, idxs: list, neighbor_state: dict = None) -> dict:
+    state = neighbor_state if neighbor_state is not None else new_library_scores(models['tfidf_matrix'].shape[0])
+    with stage('neighbor_sync'):
+        return sync_library_scores(state, models['neighbor_table'], idxs)
+
+
+def _field_weights(models: dict, weights: dict):
+    """Validated query-time field weights, or None when they match the stored ones."""
+    if not weights:
+        return None
+    fields = models['fields']
+    if fields is None:
+        raise ValueError('field weights need a bundle built with the field feature model')
+    unknown = set(weights) - set(fields['names'])
+    if unknown:
+        raise ValueError(f'unknown fields {sorted(unknown)}; expected some of {fields["names"]}')
+    weights = {f: float(w) for f, w in weights.items()}
+    if any(w < 0 or not np.isfinite(w) for w in weights.values()):
+        raise ValueError('field weights must be finite and >= 0')
+    if np.array_equal(features.weight_vector(fields, weights), fields['weights']):
+        return None
+    return weights
+
+
+def _exact_scores(models: dict, idxs: list, weights: dict = None) -> np.ndarray:
+    X = models['tfidf_matrix']
+    if weights is not None:
+        with stage('similarity'):
+            scores = features.weighted_scores(X, models['fields'], idxs, weights)
+        count('candidates_scanned', X.shape[0])
+        return scores
+    with stage('centroid'):
+        centroid = np.asarray(X[idxs].mean(axis=0))       # plain array, not np.matrix
+    with stage('similarity'):
+        if models['normalized']:                           # unit rows: cosine is a plain dot product
+            query  = centroid.ravel() / max(float(np.linalg.norm(centroid)), 1e-12)
+            scores = X @ query.astype(X.dtype, copy=False)
+        else:
+            scores = cosine_similarity(centroid, X).flatten()  # one query against the whole catalog
+    count('candidates_scanned', X.shape[0])
+    return scores
+
+
+def _count_rejections(filters: dict, platform: str, budget: float, min_ratio: float, owned: set):
+    """Rows failing each filter on its own (a row may fail several)."""
+    count('rows_rejected_price', int(np.count_nonzero(filters['price'] > budget)))
+    count('rows_rejected_ratio', int(np.count_nonzero(filters['ratio'] < min_ratio)))
+    if platform in filters:
+        count('rows_rejected_platform', int(filters[platform].size - np.count_nonzero(filters[platform])))
+    count('rows_rejected_owned', len(owned))
+
+
+def library_candidates(models: dict, idxs: list, allowed: np.ndarray, engine: str,
+                       m: int, neighbor_state: dict = None, weights: dict = None):
+    """
+    Filter-independent top-`m` `(rows, scores)` for the library rows `idxs`
+    over the `allowed` rows (catalog minus the library). The list holds
+    every allowed row the engine can return when it is shorter than `m`.
+    """
+    if engine == 'neighbors' and models['neighbor_table'] is not None:
+        state = _library_state(models, idxs, neighbor_state)
+        with stage('neighbor_score'):
+            scores, reached = neighbor_scores(state, models['tfidf_matrix'])
+        with stage('top_n'):
+            rows = top_n(scores, allowed & reached, m)
+        return rows, scores[rows]
+    if engine == 'ann' and models['ann_engine'] is not None:
+        emb, _, ivf = models['ann_engine']
+        query = np.asarray(emb[idxs]).mean(axis=0)
+        with stage('ann_search'):
+            return ann_search(ivf, emb, query / max(np.linalg.norm(query), 1e-12), m, allowed)
+    scores = _exact_scores(models, idxs, weights)
+    with stage('top_n'):
+        rows = top_n(scores, allowed, m)
+    return rows, scores[rows]
+
+
+def _cached_top_n(models: dict, cache, idxs: list, owned: set, mask: np.ndarray,
+                  n: int, engine: str, neighbor_state: dict = None, weights: dict = None):
+    """Top-`n` from the cached candidate list, or None when it cannot answer."""
+    label = engine
+    if weights is not None:
+        label += '@' + ','.join(f'{w:g}' for w in features.weight_vector(models['fields'], weights))
+    key = cache_key(models['version'], label, idxs)
+    with stage('cache_get'):
+        hit = cache.get(key)
+    count('cache_miss' if hit is None else 'cache_hit')
+    if hit is None:
+        allowed = np.ones(mask.size, dtype=bool)
+        allowed[list(owned)] = False
+        hit = library_candidates(models, idxs, allowed, engine, cache.top_m, neighbor_state, weights)
+        with stage('cache_put'):
+            cache.put(key, *hit)
+    rows, scores = hit
+    keep = np.flatnonzero(mask[rows])[:n]
+    if keep.size == n or (engine == 'exact' and len(rows) < cache.top_m):
+        return rows[keep], scores[keep]
+    count('cache_short')
+    return None                     # too few survivors — take the uncached path
+
+
+def _reranked(models: dict, idxs: list, owned: set, mask: np.ndarray, n: int, engine: str,
+              blend: dict, neighbor_state: dict = None, cache=None, weights: dict = None):
+    """Stage one retrieves `RERANK_DEPTH` candidates, stage two re-ranks them by `blend`."""
+    depth  = max(RERANK_DEPTH, n)
+    picked = None
+    if cache is not None:
+        picked = _cached_top_n(models, cache, idxs, owned, mask, depth, engine, neighbor_state, weights)
+    if picked is None:
+        picked = library_candidates(models, idxs, mask, engine, depth, neighbor_state, weights)
+        if len(picked[0]) < n and engine != 'exact':
+            count('fallback_exact')
+            picked = library_candidates(models, idxs, mask, 'exact', depth, weights=weights)
+    rows, scores = picked
+    vectors = None
+    if blend['diversity'] > 0:
+        vectors = models['ann_engine'][0][rows] if models['ann_engine'] is not None else models['tfidf_matrix'][rows]
+    with stage('rerank'):
+        return rerank(rows, scores, models['priors'], models['filters']['price'], idxs, n, blend, vectors)
+
+
+@instrument.traced('recommend')
+def recommend(models: dict, library_titles, platform: str = 'win', budget: float = 60,
+              min_ratio: float = 50, n: int = 6, engine: str = 'exact',
+              neighbor_state: dict = None, cache=None, weights: dict = None,
+              blend: dict = None) -> list:
+    """
+    Top-`n` games for the library centroid under the given filters.
+
+    engine='ann' searches the IVF embedding index and engine='neighbors'
+    merges the members' precomputed top-K lists; both fall back to the
+    exact brute-force cosine when they run out of candidates (or when the
+    bundle lacks their index). Pass a `neighbor_state` kept between calls
+    to update neighbor scores incrementally as the library grows, and a
+    `cache.ResultCache` to reuse per-library candidate lists across filter
+    changes, sessions and (with the SQLite store) processes.
+
+    `weights` ({field: weight}) re-weights the blocks of a field-model
+    bundle for this query only; the neighbor and ANN indexes are built on
+    the stored weights, so custom weights always score exactly.
+
+    `blend` (a dict, `{}` for the defaults) turns on the second stage:
+    the top `RERANK_DEPTH` candidates are re-ranked by similarity plus
+    quality / popularity / price-fit priors, optionally diversified by MMR
+    (see `rerank`); the returned `score` is then the blended one, and
+    `similarity` keeps the stage-one cosine for display.
+    """
+    if engine not in ENGINES:
+        raise ValueError(f'unknown engine {engine!r}; expected one of {ENGINES}')
+    weights = _field_weights(models, weights)
+    if weights is not None:
+        engine = 'exact'
+    if blend is not None:
+        blend = blend_weights(blend)
+    lookup = models['lookup']
+    with stage('lookup'):
+        idxs  = list(dict.fromkeys(title_rows(lookup, library_titles)))   # a library is a set
+        # Library games (and any rows sharing their titles) are never recommended
+        owned = owned_rows(lookup, library_titles)
+    count('library_rows', len(idxs))
+    if not idxs:
+        return []
+
+    with stage('filter'):
+        mask = candidate_mask(models['filters'], platform, budget, min_ratio, exclude=owned)
+    if instrument.enabled():
+        _count_rejections(models['filters'], platform, budget, min_ratio, owned)
+
+    if blend is not None:
+        rows, scores, similarity = _reranked(models, idxs, owned, mask, n, engine, blend,
+                                             neighbor_state, cache, weights)
+        with stage('records'):
+            return records(models, rows, scores, similarity)
+
+    if cache is not None:
+        picked = _cached_top_n(models, cache, idxs, owned, mask, n, engine, neighbor_state, weights)
+        if picked is not None:
+            with stage('records'):
+                return records(models, *picked)
+
+    if engine == 'neighbors' and models['neighbor_table'] is not None:
+        state = _library_state(models, idxs, neighbor_state)
+        with stage('neighbor_score'):
+            picked = neighbor_top_n(state, models['tfidf_matrix'], mask, n)
+        if picked is not None:
+            rows, scores = picked
+            with stage('records'):
+                return records(models, rows, scores[rows])
+        count('fallback_exact')
+
+    if engine == 'ann' and models['ann_engine'] is not None:
+        emb, _, ivf = models['ann_engine']
+        query = np.asarray(emb[idxs]).mean(axis=0)
+        with stage('ann_search'):
+            rows, row_scores = ann_search(ivf, emb, query / max(np.linalg.norm(query), 1e-12), n, mask)
+        if len(rows) == n:
+            with stage('records'):
+                return records(models, rows, row_scores)
+        count('fallback_exact')
+
+    scores = _exact_scores(models, idxs, weights)
+    with stage('top_n'):
+        rows = top_n(scores, mask, n)
+    with stage('records'):
+        return records(models, rows, scores[rows])
+
+
+@instrument.traced('recommend_many')
+def recommend_many(models: dict, queries, cache=None) -> list:
+    """`recommend` for each keyword dict in `queries`, results in order."""
+    return [recommend(models, **q, cache=cache) for q in queries]
@@ -0,0 +1,246 @@
+"""
+Offline evaluation harness for a published model bundle.
+
+Every query game is scored once and all K values are read from that one
+top-`max(K)` ranking. Queries are split into seeded, disjoint held-out
+folds and sharded over a process pool. Each worker memory-maps the same
+bundle, so the model pages are shared, not copied. An item counts as
+relevant to a query when it shares the query's label (`rating` by
+default, as in the notebook's Precision@K). Per fold and overall the
+harness reports:
+
+- precision / recall / nDCG / MAP @ K (mean, plus std across folds)
+- catalog coverage, Gini, intra-list diversity and novelty @ K
+- throughput: scoring queries per second and wall time
+
+The JSON report records the bundle version, so runs can be tracked
+across model versions; `--compare old.json` prints the metric deltas.
+
+    python evaluate.py                                   # whole catalog, 5 folds
+    python evaluate.py --queries 20000 --seed 7 --workers 4 --out eval.json
+    python evaluate.py --engine neighbors --compare eval.json
+"""
+import argparse
+import json
+import os
+import platform
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import normalize
+
+import metrics
+from ann import ann_from_bundle, ann_search
+from model_bundle import MODEL_DIR, load_bundle
+from neighbors import table_from_bundle
+from recommender import recommend_batch
+
+K_VALUES   = (5, 10, 20)
+ENGINES    = ('exact', 'neighbors', 'ann')
+LABELS     = ('rating', 'price_tier')
+SHARD_SIZE = 2048
+REPORT_METRICS = ('precision', 'recall', 'ndcg', 'map')
+
+
+# ─────────────────────────────────────────────
+# WORKER SIDE  (one bundle mapping per process)
+# ─────────────────────────────────────────────
+_WORKER = {}
+
+
+def _init_worker(root: str, version: str):
+    bundle = load_bundle(root, version)
+    X = bundle['tfidf_matrix']
+    if not bundle['manifest']['tfidf']['normalized']:
+        X = normalize(X, norm='l2')
+    _WORKER.update(X=X, table=table_from_bundle(bundle), ann=ann_from_bundle(bundle))
+
+
+def _score_shard(args):
+    """Top-`k` rows (self excluded) for the query rows of one shard."""
+    rows, k, engine = args
+    if engine == 'neighbors':
+        return np.asarray(_WORKER['table'][0][rows, :k], dtype=np.int64)
+    if engine == 'ann':
+        emb, _, ivf = _WORKER['ann']
+        allowed = np.ones(emb.shape[0], dtype=bool)
+        out = np.full((len(rows), k), -1, dtype=np.int64)
+        for i, row in enumerate(rows):
+            allowed[row] = False
+            found = ann_search(ivf, emb, np.asarray(emb[row]), k, allowed)[0]
+            out[i, :len(found)] = found
+            allowed[row] = True
+        return out
+    return recommend_batch(_WORKER['X'], rows, k=k, normalized=True)[0]
+
+
+def score_queries(root: str, version: str, rows: np.ndarray, k: int, engine: str = 'exact',
+                  workers: int = 1) -> np.ndarray:
+    """(len(rows), k) top lists, sharded over `workers` processes."""
+    shards = [(rows[i:i + SHARD_SIZE], k, engine) for i in range(0, len(rows), SHARD_SIZE)]
+    if workers <= 1:
+        _init_worker(root, version)
+        parts = [_score_shard(s) for s in shards]
+    else:
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(root, version)) as pool:
+            parts = list(pool.map(_score_shard, shards))
+    return np.concatenate(parts) if parts else np.empty((0, k), dtype=np.int64)
+
+
+# ─────────────────────────────────────────────
+# METRICS
+# ─────────────────────────────────────────────
+def labels_for(games: pd.DataFrame, label: str) -> np.ndarray:
+    """Integer label per game (`price_tier` is derived from `price_final`)."""
+    if label == 'price_tier':
+        from pipeline import PRICE_BINS
+        values = pd.cut(games['price_final'], bins=PRICE_BINS, labels=False)
+    else:
+        values = games[label]
+    codes = pd.factorize(values)[0]
+    codes[codes < 0] = codes.max() + 1          # missing labels form one group
+    return codes
+
+
+def held_out_folds(n_games: int, n_queries: int, n_folds: int, seed: int) -> list:
+    """Seeded sample of `n_queries` rows (all when 0) split into disjoint folds."""
+    rng  = np.random.default_rng(seed)
+    rows = rng.permutation(n_games)[:n_queries or n_games]
+    return np.array_split(rows, max(1, n_folds))
+
+
+def ranking_metrics(top: np.ndarray, rows: np.ndarray, labels: np.ndarray, k_values) -> dict:
+    """Mean precision / recall / nDCG / MAP per K for one set of queries."""
+    relevant, n_relevant = metrics.label_relevance(top, rows, labels)
+    return {k: {'precision': float(metrics.precision_at_k(relevant, k).mean()),
+                'recall':    float(metrics.recall_at_k(relevant, n_relevant, k).mean()),
+                'ndcg':      float(metrics.ndcg_at_k(relevant, n_relevant, k).mean()),
+                'map':       float(metrics.average_precision_at_k(relevant, n_relevant, k).mean())}
+            for k in k_values}
+
+
+def catalog_metrics(bundle: dict, top: np.ndarray, k_values, diversity_sample: int, seed: int) -> dict:
+    games, n = bundle['games'], len(bundle['games'])
+    rng  = np.random.default_rng(seed)
+    pick = rng.choice(len(top), size=min(diversity_sample, len(top)), replace=False)
+    out = {}
+    for k in k_values:
+        out[k] = {'coverage':  metrics.catalog_coverage(top[:, :k], n),
+                  'gini':      metrics.gini_index(top[:, :k], n),
+                  'diversity': float(metrics.intra_list_diversity_batch(
+                                     bundle['tfidf_matrix'], top[pick, :k]).mean())}
+        if 'user_reviews' in games.columns:
+            out[k]['novelty'] = metrics.novelty(top[:, :k], games['user_reviews'])
+    return out
+
+
+def evaluate(root: str = MODEL_DIR, version: str = None, engine: str = 'exact',
+             k_values=K_VALUES, n_queries: int = 0, n_folds: int = 5, seed: int = 42,
+             label: str = 'rating', workers: int = 1, diversity_sample: int = 2000) -> dict:
+    """Run the whole evaluation and return the JSON-ready report."""
+    bundle  = load_bundle(root, version)
+    version = bundle['version']
+    if (engine == 'neighbors' and table_from_bundle(bundle) is None
+            or engine == 'ann' and ann_from_bundle(bundle) is None):
+        raise ValueError(f'bundle {version} has no {engine} index')
+    k_values = sorted(set(k_values))
+    k_max    = max(k_values)
+    if engine == 'neighbors':
+        k_max = min(k_max, table_from_bundle(bundle)[0].shape[1])
+        k_values = [k for k in k_values if k <= k_max]
+
+    folds  = held_out_folds(len(bundle['games']), n_queries, n_folds, seed)
+    rows   = np.concatenate(folds)
+    labels = labels_for(bundle['games'], label)
+
+    t0  = time.perf_counter()
+    top = score_queries(root, version, rows, k_max, engine, workers)
+    elapsed = time.perf_counter() - t0
+
+    per_fold, start = [], 0
+    for fold in folds:
+        per_fold.append(ranking_metrics(top[start:start + len(fold)], fold, labels, k_values))
+        start += len(fold)
+    summary = {k: {m: {'mean': float(np.mean([f[k][m] for f in per_fold])),
+                       'std':  float(np.std([f[k][m] for f in per_fold]))}
+                   for m in REPORT_METRICS}
+               for k in k_values}
+
+    manifest = bundle['manifest']
+    return {
+        'model':   {'version': version, 'created': manifest.get('created'),
+                    'n_games': manifest['n_games'], 'n_features': manifest['n_features'],
+                    'tfidf': manifest.get('tfidf')},
+        'setup':   {'engine': engine, 'label': label, 'k_values': k_values, 'seed': seed,
+                    'queries': int(len(rows)), 'folds': len(folds), 'workers': workers,
+                    'python': platform.python_version(), 'cpus': os.cpu_count(),
+                    'created': time.strftime('%Y-%m-%dT%H:%M:%S')},
+        'throughput': {'seconds': elapsed, 'qps': len(rows) / elapsed if elapsed else 0.0},
+        'ranking': {str(k): v for k, v in summary.items()},
+        'folds':   [{str(k): v for k, v in f.items()} for f in per_fold],
+        'catalog': {str(k): v for k, v in
+                    catalog_metrics(bundle, top, k_values, diversity_sample, seed).items()},
+    }
+
+
+# ─────────────────────────────────────────────
+# REPORTING
+# ─────────────────────────────────────────────
+def print_report(report: dict):
+    model, setup = report['model'], report['setup']
+    print(f' Model {model["version"]} — {setup["engine"]}, label={setup["label"]}, '
+          f'{setup["queries"]:,} queries in {setup["folds"]} folds')
+    print(f' Throughput: {report["throughput"]["qps"]:,.0f} queries/s '
+          f'({report["throughput"]["seconds"]:.1f} s, {setup["workers"]} workers)')
+    for k, m in report['ranking'].items():
+        cat = report['catalog'][k]
+        print(f'   @{k:>3s}  ' + '  '.join(f'{name} {m[name]["mean"]:.4f}±{m[name]["std"]:.4f}'
+                                         for name in REPORT_METRICS)
+              + f'  coverage {cat["coverage"]:.2%}  diversity {cat["diversity"]:.4f}')
+
+
+def compare(report: dict, previous: dict):
+    """Print mean-metric deltas against an earlier report."""
+    print(f' vs {previous["model"]["version"]} ({previous["setup"]["engine"]}, '
+          f'{previous["setup"]["queries"]:,} queries):')
+    for k, m in report['ranking'].items():
+        if k not in previous['ranking']:
+            continue
+        old = previous['ranking'][k]
+        print(f'   @{k:>3s}  ' + '  '.join(f'{name} {m[name]["mean"] - old[name]["mean"]:+.4f}'
+                                         for name in REPORT_METRICS))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Evaluate a SteamLens model bundle offline')
+    parser.add_argument('--models', default=MODEL_DIR, help='bundle root directory')
+    parser.add_argument('--version', default=None, help='bundle version (default: CURRENT)')
+    parser.add_argument('--engine', choices=ENGINES, default='exact')
+    parser.add_argument('--k', type=int, nargs='+', default=list(K_VALUES))
+    parser.add_argument('--queries', type=int, default=0, help='sampled query games (0 = whole catalog)')
+    parser.add_argument('--folds', type=int, default=5, help='disjoint held-out query folds')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--label', choices=LABELS, default='rating', help='relevance label')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--diversity-sample', type=int, default=2000,
+                        help='lists used for intra-list diversity')
+    parser.add_argument('--out', help='write the JSON report here')
+    parser.add_argument('--compare', help='earlier JSON report to diff against')
+    args = parser.parse_args()
+
+    report = evaluate(args.models, args.version, args.engine, args.k, args.queries, args.folds,
+                      args.seed, args.label, args.workers, args.diversity_sample)
+    print_report(report)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f' Report written to {args.out}')
+
+
+if __name__ == '__main__':
+    main()
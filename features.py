@@ -0,0 +1,209 @@
+"""
+Structured weighted-field feature model.
+
+Instead of repeating the title three times and the rating twice in one
+string, every field gets its own sparse block:
+
+    title       TF-IDF over the title alone (uni+bigrams, no cross-field n-grams)
+    rating      one-hot review label
+    price_tier  one-hot price tier
+    platforms   win / mac / linux flags
+    numeric     `rating_score` and `price_norm`, each encoded as the unit
+                vector (cos θ, sin θ) with θ = value × π/2, so their dot
+                product falls off with the distance between values
+
+Each block is L2-normalized per row and scaled by its field weight, and
+the blocks are joined with `hstack`. A field's share of the cosine grows
+with weight². Since each block has unit norm, a row's norm under any
+weights only depends on which fields it has (`presence`). `weighted_scores`
+therefore re-weights the stored matrix at query time without
+re-tokenizing or rebuilding anything.
+"""
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import normalize
+
+from pipeline import PRICE_TIERS, RATING_LEVELS, TFIDF_PARAMS, feature_text
+
+FIELDS = ('title', 'rating', 'price_tier', 'platforms', 'numeric')
+DEFAULT_WEIGHTS = {'title': 1.0, 'rating': 0.5, 'price_tier': 0.35, 'platforms': 0.2, 'numeric': 0.35}
+PLATFORM_COLUMNS = ('win', 'mac', 'linux')
+NUMERIC_COLUMNS  = {'rating_score': 6.0, 'price_norm': 1.0}     # column → value giving θ = π/2
+
+
+# ─────────────────────────────────────────────
+# FIELD BLOCKS
+# ─────────────────────────────────────────────
+def _one_hot(values: pd.Series, levels) -> sp.csr_matrix:
+    codes = pd.Categorical(values.astype(str), categories=list(levels)).codes
+    rows  = np.flatnonzero(codes >= 0)
+    return sp.csr_matrix((np.ones(rows.size), (rows, codes[rows])), shape=(len(values), len(levels)))
+
+
+def _platforms(games: pd.DataFrame) -> sp.csr_matrix:
+    cols = [games[c].fillna(False).to_numpy(dtype=np.float64) if c in games.columns
+            else np.zeros(len(games)) for c in PLATFORM_COLUMNS]
+    return sp.csr_matrix(np.column_stack(cols))
+
+
+def _numeric(games: pd.DataFrame) -> sp.csr_matrix:
+    cols = []
+    for col, top in NUMERIC_COLUMNS.items():
+        values = games[col].to_numpy(dtype=np.float64) if col in games.columns else np.zeros(len(games))
+        theta  = np.clip(np.nan_to_num(values / top), 0.0, 1.0) * (np.pi / 2)
+        cols  += [np.cos(theta), np.sin(theta)]
+    block = np.column_stack(cols)
+    block[np.abs(block) < 1e-12] = 0.0          # cos(π/2) is 6e-17, not a stored zero
+    return sp.csr_matrix(block)
+
+
+class FieldFeaturizer:
+    """
+    Fits and applies the per-field blocks; stored in the bundle in place of
+    the single TfidfVectorizer (same `fit_transform` / `transform` /
+    `get_feature_names_out` surface, but it takes the games frame).
+    """
+
+    def __init__(self, weights: dict = None, fields=FIELDS, title_params: dict = None):
+        unknown = set(fields) - set(FIELDS)
+        if unknown:
+            raise ValueError(f'unknown fields {sorted(unknown)}; expected some of {FIELDS}')
+        self.fields  = tuple(f for f in FIELDS if f in fields)
+        self.weights = {f: float((weights or DEFAULT_WEIGHTS).get(f, DEFAULT_WEIGHTS[f])) for f in self.fields}
+        self.title_params = dict(title_params or TFIDF_PARAMS)
+
+    def _block(self, field: str, games: pd.DataFrame, fit: bool):
+        if field == 'title':
+            title = games['title'].astype(str)
+            if fit:
+                self.title_vectorizer_ = TfidfVectorizer(**self.title_params)
+                return self.title_vectorizer_.fit_transform(title)
+            return self.title_vectorizer_.transform(title)
+        if field == 'rating':
+            return _one_hot(games['rating'], RATING_LEVELS)
+        if field == 'price_tier':
+            return _one_hot(games['price_tier'], PRICE_TIERS)
+        if field == 'platforms':
+            return _platforms(games)
+        return _numeric(games)
+
+    def _blocks(self, games: pd.DataFrame, fit: bool) -> list:
+        return [normalize(self._block(f, games, fit).tocsr(), norm='l2') for f in self.fields]
+
+    def _combine(self, blocks: list) -> sp.csr_matrix:
+        self.offsets_ = np.cumsum([0] + [b.shape[1] for b in blocks]).astype(np.int64)
+        return sp.hstack([b * self.weights[f] for f, b in zip(self.fields, blocks)], format='csr')
+
+    def fit_transform(self, games: pd.DataFrame) -> sp.csr_matrix:
+        return self._combine(self._blocks(games, fit=True))
+
+    def fit(self, games: pd.DataFrame):
+        self.fit_transform(games)
+        return self
+
+    def transform(self, games: pd.DataFrame) -> sp.csr_matrix:
+        return self._combine(self._blocks(games, fit=False))
+
+    def get_feature_names_out(self) -> np.ndarray:
+        names = {'title':      lambda: [f'title:{t}' for t in self.title_vectorizer_.get_feature_names_out()],
+                 'rating':     lambda: [f'rating:{r}' for r in RATING_LEVELS],
+                 'price_tier': lambda: [f'price_tier:{t}' for t in PRICE_TIERS],
+                 'platforms':  lambda: [f'platform:{p}' for p in PLATFORM_COLUMNS],
+                 'numeric':    lambda: [f'{c}:{part}' for c in NUMERIC_COLUMNS for part in ('cos', 'sin')]}
+        return np.array([name for f in self.fields for name in names[f]()], dtype=object)
+
+
+def fit_fields(games: pd.DataFrame, weights: dict = None, fields=FIELDS):
+    """
+    Fit the field model on `games`; returns `(featurizer, matrix)`.
+
+    Leaving out 'platforms' / 'numeric' (about 1.5 and 4 nonzeros per row)
+    gives the sparsest matrix; platforms are still enforced by the filters.
+    """
+    featurizer = FieldFeaturizer(weights, fields)
+    return featurizer, featurizer.fit_transform(games)
+
+
+def featurize(model, games: pd.DataFrame):
+    """Rows for `games` under a fitted feature model (field model or TF-IDF string model)."""
+    if isinstance(model, FieldFeaturizer):
+        return model.transform(games)
+    return model.transform(feature_text(games))
+
+
+# ─────────────────────────────────────────────
+# BUNDLE ARRAYS
+# ─────────────────────────────────────────────
+def presence(matrix, offsets) -> np.ndarray:
+    """(N, fields) uint8 — 1 where a row has any nonzero in that field's block."""
+    X = sp.csr_matrix(matrix)
+    cols  = X.indices
+    field = np.searchsorted(np.asarray(offsets)[1:], cols, side='right')
+    rows  = np.repeat(np.arange(X.shape[0]), np.diff(X.indptr))
+    out = np.zeros((X.shape[0], len(offsets) - 1), dtype=np.uint8)
+    out[rows, field] = 1
+    return out
+
+
+def field_arrays(featurizer: FieldFeaturizer, matrix) -> dict:
+    """Bundle array names for the field layout of `matrix`."""
+    return {'fields.names':    np.array(featurizer.fields),
+            'fields.weights':  np.array([featurizer.weights[f] for f in featurizer.fields], dtype=np.float64),
+            'fields.offsets':  featurizer.offsets_,
+            'fields.presence': presence(matrix, featurizer.offsets_)}
+
+
+def fields_from_bundle(bundle: dict):
+    """
+    Field layout `{'names', 'weights', 'offsets', 'presence', 'row_norms'}`
+    from a bundle, or None. `row_norms` holds the default-weight row norms
+    when the bundle stores unit rows, else None.
+    """
+    arrays = bundle['arrays']
+    if 'fields.offsets' not in arrays:
+        return None
+    fields = {'names':    [str(n) for n in arrays['fields.names']],
+              'weights':  np.asarray(arrays['fields.weights'], dtype=np.float64),
+              'offsets':  np.asarray(arrays['fields.offsets']),
+              'presence': arrays['fields.presence'],
+              'row_norms': None}
+    if bundle['manifest']['tfidf']['normalized']:
+        fields['row_norms'] = np.sqrt(np.asarray(fields['presence'], dtype=np.float64) @ fields['weights'] ** 2)
+    return fields
+
+
+# ─────────────────────────────────────────────
+# QUERY-TIME WEIGHTS
+# ─────────────────────────────────────────────
+def weight_vector(fields: dict, weights: dict) -> np.ndarray:
+    """Per-field weights in layout order; fields missing from `weights` keep their default."""
+    return np.array([float(weights.get(name, w)) for name, w in zip(fields['names'], fields['weights'])])
+
+
+def weighted_scores(matrix, fields: dict, rows, weights: dict) -> np.ndarray:
+    """
+    Cosine of every catalog row to the centroid of `rows` under `weights`
+    (field → weight), computed on the stored default-weighted matrix.
+
+    When the bundle stores unit rows (`fields['row_norms']` set) the
+    centroid averages the re-weighted rows at unit length, as the default
+    path does; otherwise it averages them as stored.
+    """
+    w     = weight_vector(fields, weights)
+    ratio = np.divide(w, fields['weights'], out=np.zeros_like(w), where=fields['weights'] > 0)
+    scale = np.repeat(ratio, np.diff(fields['offsets']))                  # per column
+    base  = fields.get('row_norms')
+    norms = np.sqrt(np.asarray(fields['presence'], dtype=np.float64) @ (w ** 2))
+
+    lib = matrix[rows]
+    if base is not None:                                                 # unit rows under `weights`
+        row_scale = np.divide(base[rows], norms[rows], out=np.zeros(len(rows)), where=norms[rows] > 0)
+        lib = lib.multiply(row_scale[:, None])
+    query = np.asarray(lib.mean(axis=0)).ravel() * scale                 # centroid under new weights
+    dots  = np.asarray(matrix @ (query * scale)).ravel()
+    if base is not None:
+        dots *= base
+    denom = norms * np.linalg.norm(query)
+    return np.divide(dots, denom, out=np.zeros_like(dots), where=denom > 0)
@@ -0,0 +1,223 @@
+"""
+Lightweight per-stage timing, counters and slow-request profiling.
+
+Off by default and close to free when off. Environment switches:
+
+    STEAMLENS_METRICS=1            record stage timers and counters
+    STEAMLENS_METRICS_LOG=1        also log one JSON line per request
+                                   (logger "steamlens.metrics", INFO)
+    STEAMLENS_PROFILE_MS=250       cProfile requests and dump those slower
+                                   than 250 ms to STEAMLENS_PROFILE_DIR
+                                   (default "profiles") as .prof + .txt
+    STEAMLENS_PROFILE_SAMPLE=0.1   share of requests profiled (default 1.0)
+
+Code marks work with `stage('name')` blocks and `count('event', n)`;
+`traced('name')` wraps a public entry point as one request. Totals are
+exported with `prometheus_text()` or `snapshot()`, and the most recent
+request breakdown with `last_request()`. Profiling works without the
+timers (it needs only STEAMLENS_PROFILE_MS).
+"""
+import contextlib
+import contextvars
+import cProfile
+import functools
+import io
+import itertools
+import json
+import logging
+import os
+import pstats
+import random
+import threading
+import time
+
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+logger = logging.getLogger('steamlens.metrics')
+
+_lock     = threading.Lock()
+_current  = contextvars.ContextVar('steamlens_request', default=None)
+_NULL     = contextlib.nullcontext()
+_settings = {}
+_stages   = {}          # name → {'count', 'sum', 'max', 'buckets'}
+_counters = {}          # name → total
+_last     = None
+_seq      = itertools.count()
+
+
+def configure(env=None):
+    """(Re)read the switches from `env` (default `os.environ`)."""
+    env = os.environ if env is None else env
+    _settings.update(
+        enabled=env.get('STEAMLENS_METRICS', '') not in ('', '0'),
+        log=env.get('STEAMLENS_METRICS_LOG', '') not in ('', '0'),
+        profile_ms=float(env.get('STEAMLENS_PROFILE_MS') or 0),
+        profile_sample=float(env.get('STEAMLENS_PROFILE_SAMPLE') or 1.0),
+        profile_dir=env.get('STEAMLENS_PROFILE_DIR') or 'profiles')
+
+
+def enabled() -> bool:
+    """True when stage timers and counters are being recorded."""
+    return _settings['enabled']
+
+
+def reset():
+    global _last
+    with _lock:
+        _stages.clear()
+        _counters.clear()
+        _last = None
+
+
+configure()
+
+
+# ─────────────────────────────────────────────
+# RECORDING
+# ─────────────────────────────────────────────
+def _observe(name: str, seconds: float):
+    with _lock:
+        s = _stages.get(name)
+        if s is None:
+            s = _stages[name] = {'count': 0, 'sum': 0.0, 'max': 0.0, 'buckets': [0] * len(BUCKETS)}
+        s['count'] += 1
+        s['sum']   += seconds
+        s['max']    = max(s['max'], seconds)
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                s['buckets'][i] += 1
+                break
+
+
+@contextlib.contextmanager
+def _timed_stage(name: str):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - t0
+        _observe(name, seconds)
+        trace = _current.get()
+        if trace is not None:
+            trace['stages'][name] = trace['stages'].get(name, 0.0) + 1e3 * seconds
+
+
+def stage(name: str):
+    """Context manager timing one stage (a no-op when metrics are off)."""
+    return _timed_stage(name) if _settings['enabled'] else _NULL
+
+
+def count(name: str, value: int = 1):
+    """Add `value` to counter `name` (and to the current request's counters)."""
+    if not _settings['enabled']:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+    trace = _current.get()
+    if trace is not None:
+        trace['counters'][name] = trace['counters'].get(name, 0) + value
+
+
+# ─────────────────────────────────────────────
+# REQUESTS + PROFILING
+# ─────────────────────────────────────────────
+def _dump_profile(profiler: cProfile.Profile, name: str, total_ms: float) -> str:
+    os.makedirs(_settings['profile_dir'], exist_ok=True)
+    base = os.path.join(_settings['profile_dir'],
+                        f'{time.strftime("%Y%m%d-%H%M%S")}-{os.getpid()}-{next(_seq)}-{name}-{int(total_ms)}ms')
+    profiler.dump_stats(base + '.prof')
+    text = io.StringIO()
+    pstats.Stats(profiler, stream=text).sort_stats('cumulative').print_stats(30)
+    with open(base + '.txt', 'w') as f:
+        f.write(text.getvalue())
+    return base + '.prof'
+
+
+def traced(name: str):
+    """
+    Decorator marking a public entry point as one request. Nested traced
+    calls (e.g. `recommend` inside `recommend_many`) count as stages of the
+    outer request.
+    """
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            metrics, profile_ms = _settings['enabled'], _settings['profile_ms']
+            if not metrics and not profile_ms:
+                return fn(*args, **kwargs)
+            if _current.get() is not None:
+                with stage(name):
+                    return fn(*args, **kwargs)
+
+            trace = {'request': name, 'stages': {}, 'counters': {}}
+            token = _current.set(trace)
+            profiler = None
+            if profile_ms and random.random() < _settings['profile_sample']:
+                profiler = cProfile.Profile()
+                try:
+                    profiler.enable()
+                except ValueError:      # another thread is being profiled
+                    profiler = None
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                seconds = time.perf_counter() - t0
+                if profiler is not None:
+                    profiler.disable()
+                _current.reset(token)
+                _finish(trace, name, seconds, profiler)
+        return inner
+    return wrap
+
+
+def _finish(trace: dict, name: str, seconds: float, profiler):
+    global _last
+    trace['total_ms'] = 1e3 * seconds
+    if profiler is not None and trace['total_ms'] >= _settings['profile_ms']:
+        trace['profile'] = _dump_profile(profiler, name, trace['total_ms'])
+    if _settings['enabled']:
+        _observe(f'request:{name}', seconds)
+        _last = trace
+        if _settings['log']:
+            logger.info(json.dumps(trace))
+    elif 'profile' in trace:
+        logger.warning('slow %s request (%.0f ms), profile written to %s',
+                       name, trace['total_ms'], trace['profile'])
+
+
+# ─────────────────────────────────────────────
+# EXPORT
+# ─────────────────────────────────────────────
+def last_request() -> dict:
+    """Stage / counter breakdown of the most recent traced request, or None."""
+    return _last
+
+
+def snapshot() -> dict:
+    """Totals so far: per-stage count / sum / mean / max (ms) and counters."""
+    with _lock:
+        stages = {name: {'count': s['count'], 'total_ms': 1e3 * s['sum'],
+                         'mean_ms': 1e3 * s['sum'] / s['count'], 'max_ms': 1e3 * s['max']}
+                  for name, s in _stages.items()}
+        return {'enabled': _settings['enabled'], 'stages': stages, 'counters': dict(_counters)}
+
+
+def prometheus_text(prefix: str = 'steamlens') -> str:
+    """Totals in the Prometheus text exposition format."""
+    lines = [f'# HELP {prefix}_stage_seconds Time spent per recommendation stage.',
+             f'# TYPE {prefix}_stage_seconds histogram']
+    with _lock:
+        for name, s in sorted(_stages.items()):
+            label, cumulative = f'stage="{name}"', 0
+            for bound, n in zip(BUCKETS, s['buckets']):
+                cumulative += n
+                lines.append(f'{prefix}_stage_seconds_bucket{{{label},le="{bound}"}} {cumulative}')
+            lines.append(f'{prefix}_stage_seconds_bucket{{{label},le="+Inf"}} {s["count"]}')
+            lines.append(f'{prefix}_stage_seconds_sum{{{label}}} {s["sum"]:.9f}')
+            lines.append(f'{prefix}_stage_seconds_count{{{label}}} {s["count"]}')
+        lines += [f'# HELP {prefix}_events_total Recommendation path counters.',
+                  f'# TYPE {prefix}_events_total counter']
+        lines += [f'{prefix}_events_total{{event="{name}"}} {value}'
+                  for name, value in sorted(_counters.items())]
+    return '\n'.join(lines) + '\n'
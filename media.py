@@ -0,0 +1,221 @@
+"""
+Thumbnail cache for result and recommendation cards.
+
+Header images are downloaded once into a local directory and served from
+disk afterwards; the directory is kept under `max_bytes` by deleting the
+least recently used files (file mtime is the use time). Downloads run on
+two small thread pools, so images on screen never queue behind prefetches:
+
+    prefetch(app_ids)          queue downloads, return at once
+    wait_for(app_ids, timeout) bytes per app id after at most `timeout`
+                               seconds in total — None for images that are
+                               slow or failed, so the card shows a placeholder
+
+Because a page waits on all of its images under one deadline, render time
+does not grow with the number of cards; an image that already missed one
+deadline is not waited for again while it downloads. Failed downloads are
+remembered for `retry_after` seconds, so a missing image is not refetched
+on every rerun.
+
+Environment switches:
+
+    STEAMLENS_IMAGE_URL       URL template with {app_id} (default: Steam CDN
+                              header image); point it at a local server to test
+    STEAMLENS_MEDIA_DIR       cache directory (default "media_cache")
+    STEAMLENS_MEDIA_MB        disk budget in MB (default 64)
+    STEAMLENS_IMAGE_TIMEOUT   seconds a page waits for its images (default 0.5)
+"""
+import http.client
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from urllib.request import Request, urlopen
+
+DEFAULT_IMAGE_URL = 'https://cdn.akamai.steamstatic.com/steam/apps/{app_id}/header.jpg'
+DEFAULT_MAX_BYTES = 64 << 20
+FETCH_TIMEOUT     = 10.0         # per download; the page itself waits RENDER_TIMEOUT at most
+RENDER_TIMEOUT    = 0.5
+RETRY_AFTER       = 600.0
+WORKERS           = 8
+IMAGE_SIGNATURES  = (b'\xff\xd8\xff', b'\x89PNG', b'GIF8', b'RIFF')   # JPEG, PNG, GIF, WebP
+
+
+class ThumbnailCache:
+    """Disk-backed LRU of header images with background downloads."""
+
+    def __init__(self, root: str = 'media_cache', url_template: str = DEFAULT_IMAGE_URL,
+                 max_bytes: int = DEFAULT_MAX_BYTES, fetch_timeout: float = FETCH_TIMEOUT,
+                 render_timeout: float = RENDER_TIMEOUT, retry_after: float = RETRY_AFTER,
+                 workers: int = WORKERS):
+        self.root           = root
+        self.url_template   = url_template
+        self.max_bytes      = int(max_bytes)
+        self.fetch_timeout  = float(fetch_timeout)
+        self.render_timeout = float(render_timeout)
+        self.retry_after    = float(retry_after)
+        self.counters = {'hits': 0, 'misses': 0, 'downloads': 0, 'failures': 0,
+                         'timeouts': 0, 'evictions': 0}
+        self._lock     = threading.RLock()
+        self._evicting = threading.Lock()
+        self._pending  = {}              # app_id → (Future, queued by prefetch)
+        self._failed   = {}              # app_id → time of the last failure
+        self._slow     = set()           # app_ids that missed a render deadline, still downloading
+        self._pool     = ThreadPoolExecutor(workers, thread_name_prefix='steamlens-media')
+        self._prefetch_pool = ThreadPoolExecutor(workers, thread_name_prefix='steamlens-prefetch')
+        os.makedirs(root, exist_ok=True)
+        self._bytes = sum(e.stat().st_size for e in os.scandir(root) if e.name.endswith('.jpg'))
+
+    def url(self, app_id) -> str:
+        return self.url_template.format(app_id=int(app_id))
+
+    def path(self, app_id) -> str:
+        return os.path.join(self.root, f'{int(app_id)}.jpg')
+
+    # ── lookups ──────────────────────────────
+    def get(self, app_id):
+        """Cached image bytes, or None (no download)."""
+        path = self.path(app_id)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)                       # mark as recently used
+        except FileNotFoundError:                # never fetched, or evicted meanwhile
+            data = None
+        with self._lock:
+            self.counters['hits' if data is not None else 'misses'] += 1
+        return data
+
+    def fetch(self, app_id):
+        """Download one image into the cache; bytes, or None on failure."""
+        app_id = int(app_id)
+        try:
+            req = Request(self.url(app_id), headers={'User-Agent': 'SteamLens'})
+            with urlopen(req, timeout=self.fetch_timeout) as resp:
+                data = resp.read()
+            if not data.startswith(IMAGE_SIGNATURES):       # e.g. an HTML error page
+                raise ValueError(f'not an image: {self.url(app_id)}')
+        except (OSError, ValueError, http.client.HTTPException):    # e.g. IncompleteRead, BadStatusLine
+            now = time.time()
+            with self._lock:
+                self.counters['failures'] += 1
+                self._failed = {a: t for a, t in self._failed.items() if now - t < self.retry_after}
+                self._failed[app_id] = now
+            return None
+        self._store(app_id, data)
+        return data
+
+    def _store(self, app_id: int, data: bytes):
+        path = self.path(app_id)
+        tmp  = f'{path}.{os.getpid()}-{threading.get_ident()}.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        old = os.path.getsize(path) if os.path.exists(path) else 0
+        os.replace(tmp, path)                    # readers never see a partial file
+        with self._lock:
+            self.counters['downloads'] += 1
+            self._bytes += len(data) - old
+            over = self._bytes > self.max_bytes
+        if over:
+            self.evict()
+
+    def evict(self):
+        """Delete least recently used images until the directory fits `max_bytes`."""
+        with self._evicting:
+            files = []
+            for entry in os.scandir(self.root):
+                try:
+                    if entry.name.endswith('.jpg'):
+                        st = entry.stat()
+                        files.append((st.st_mtime, st.st_size, entry.path))
+                except FileNotFoundError:
+                    continue
+            files.sort()
+            total, evicted = sum(f[1] for f in files), 0
+            for _, size, path in files:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    continue
+                total   -= size
+                evicted += 1
+            with self._lock:
+                self._bytes = total
+                self.counters['evictions'] += evicted
+
+    # ── background downloads ─────────────────
+    def _submit(self, app_id: int, prefetch: bool = False):
+        """
+        Future for an image that is not on disk yet, or None when it recently
+        failed. An on-screen request takes over a prefetch still in the queue.
+        """
+        with self._lock:
+            future, queued_by_prefetch = self._pending.get(app_id, (None, False))
+            if future is not None and (prefetch or not queued_by_prefetch or not future.cancel()):
+                return future
+            failed = self._failed.get(app_id)
+            if failed is not None:
+                if time.time() - failed < self.retry_after:
+                    return None
+                del self._failed[app_id]          # retry, and keep _failed from growing forever
+            future = (self._prefetch_pool if prefetch else self._pool).submit(self.fetch, app_id)
+            self._pending[app_id] = (future, prefetch)
+        future.add_done_callback(lambda f: self._done(app_id, f))
+        return future
+
+    def _done(self, app_id: int, future):
+        with self._lock:
+            if self._pending.get(app_id, (None,))[0] is future:
+                del self._pending[app_id]
+                self._slow.discard(app_id)
+
+    def prefetch(self, app_ids):
+        """Queue downloads for the images not cached yet; returns immediately."""
+        for app_id in app_ids:
+            app_id = int(app_id)
+            if not os.path.exists(self.path(app_id)):
+                self._submit(app_id, prefetch=True)
+
+    def wait_for(self, app_ids, timeout: float = None) -> dict:
+        """
+        `{app_id: bytes or None}` for a page of cards. Missing images are
+        downloaded concurrently; the call returns after `timeout` seconds
+        (default `render_timeout`) at most, with None for images still in
+        flight or failed.
+        """
+        timeout = self.render_timeout if timeout is None else timeout
+        out, futures = {}, {}
+        for app_id in map(int, app_ids):
+            out[app_id] = self.get(app_id)
+            if out[app_id] is None:
+                future = self._submit(app_id)
+                if future is not None and app_id not in self._slow:
+                    futures[app_id] = future
+        if futures:
+            wait(futures.values(), timeout=timeout)
+            for app_id, future in futures.items():
+                if future.done():
+                    ok = not future.cancelled() and future.exception() is None   # e.g. disk full in _store
+                    out[app_id] = future.result() if ok else None
+                else:
+                    with self._lock:
+                        self.counters['timeouts'] += 1
+                        if not future.done():
+                            self._slow.add(app_id)
+        return out
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self.counters, 'bytes': self._bytes, 'max_bytes': self.max_bytes,
+                    'pending': len(self._pending), 'failed': len(self._failed)}
+
+
+def thumbnail_cache(env=None) -> ThumbnailCache:
+    """A cache configured from the STEAMLENS_* switches in `env` (default `os.environ`)."""
+    env = os.environ if env is None else env
+    return ThumbnailCache(root=env.get('STEAMLENS_MEDIA_DIR') or 'media_cache',
+                          url_template=env.get('STEAMLENS_IMAGE_URL') or DEFAULT_IMAGE_URL,
+                          max_bytes=float(env.get('STEAMLENS_MEDIA_MB') or 64) * (1 << 20),
+                          render_timeout=float(env.get('STEAMLENS_IMAGE_TIMEOUT') or RENDER_TIMEOUT))
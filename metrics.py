@@ -0,0 +1,137 @@
+"""
+Ranking and beyond-accuracy metrics for recommendation lists.
+
+Lists are (Q, k) arrays of row indices as returned by
+`recommender.recommend_batch`; a row of -1 marks an empty slot and is
+ignored everywhere. Ranking metrics take the matching (Q, k) boolean
+`relevant` array and each query's number of relevant catalog items, and
+return one value per query so callers can average over any split.
+"""
+import numpy as np
+from sklearn.preprocessing import normalize
+
+
+# ─────────────────────────────────────────────
+# RANKING
+# ─────────────────────────────────────────────
+def label_relevance(top_lists, query_rows, labels):
+    """
+    `(relevant, n_relevant)` when an item is relevant to a query if it
+    shares the query's label (e.g. `rating` codes); the query itself does
+    not count towards `n_relevant`.
+    """
+    top_lists = np.asarray(top_lists)
+    labels    = np.asarray(labels)
+    query_lab = labels[np.asarray(query_rows)]
+    relevant  = (labels[np.maximum(top_lists, 0)] == query_lab[:, None]) & (top_lists >= 0)
+    n_relevant = np.bincount(labels, minlength=labels.max() + 1)[query_lab] - 1
+    return relevant, n_relevant
+
+
+def precision_at_k(relevant, k: int) -> np.ndarray:
+    """Share of each query's top-`k` slots holding a relevant item."""
+    return relevant[:, :k].sum(axis=1) / k
+
+
+def recall_at_k(relevant, n_relevant, k: int) -> np.ndarray:
+    """Share of each query's relevant items found in its top `k` (0 when it has none)."""
+    n_relevant = np.asarray(n_relevant, dtype=np.float64)
+    hits = relevant[:, :k].sum(axis=1)
+    return np.divide(hits, n_relevant, out=np.zeros(len(hits)), where=n_relevant > 0)
+
+
+def ndcg_at_k(relevant, n_relevant, k: int) -> np.ndarray:
+    """Binary-gain nDCG@k; the ideal list puts min(k, n_relevant) hits first."""
+    discounts = 1.0 / np.log2(np.arange(2, k + 2))
+    dcg   = (relevant[:, :k] * discounts[:relevant[:, :k].shape[1]]).sum(axis=1)
+    ideal = np.concatenate([[0.0], np.cumsum(discounts)])[np.minimum(n_relevant, k)]
+    return np.divide(dcg, ideal, out=np.zeros(len(dcg)), where=ideal > 0)
+
+
+def average_precision_at_k(relevant, n_relevant, k: int) -> np.ndarray:
+    """AP@k: precision at each hit within the top `k`, over min(k, n_relevant)."""
+    rel   = relevant[:, :k]
+    prec  = np.cumsum(rel, axis=1) / np.arange(1, rel.shape[1] + 1)
+    denom = np.minimum(n_relevant, k).astype(np.float64)
+    return np.divide((prec * rel).sum(axis=1), denom, out=np.zeros(len(rel)), where=denom > 0)
+
+
+# ─────────────────────────────────────────────
+# DIVERSITY
+# ─────────────────────────────────────────────
+def intra_list_diversity(tfidf_matrix, top_k) -> float:
+    """
+    Mean pairwise cosine distance (1 − cos) within one list, from a single
+    `X_topk @ X_topk.T` Gram matrix instead of K² separate similarity calls.
+    """
+    return float(intra_list_diversity_batch(tfidf_matrix, np.asarray(top_k)[None, :])[0])
+
+
+def intra_list_diversity_batch(tfidf_matrix, top_lists, chunk: int = 32) -> np.ndarray:
+    """
+    Intra-list diversity of every list in `top_lists` (Q, k).
+
+    `chunk` lists are stacked into one sparse block and multiplied with its
+    own transpose; the (k × k) diagonal blocks of that Gram matrix are the
+    per-list similarity matrices. Lists with fewer than two valid rows
+    score 0, matching the pairwise definition.
+    """
+    top_lists = np.atleast_2d(np.asarray(top_lists, dtype=np.int64))
+    n_lists, k = top_lists.shape
+    out = np.zeros(n_lists, dtype=np.float64)
+    if k < 2:
+        return out
+
+    X = tfidf_matrix.tocsr()
+    upper = np.triu(np.ones((k, k), dtype=bool), 1)
+    for start in range(0, n_lists, chunk):
+        lists = top_lists[start:start + chunk]
+        c     = len(lists)
+        valid = lists >= 0
+        Y     = normalize(X[np.where(valid, lists, 0).ravel()], norm='l2')
+        gram  = (Y @ Y.T).toarray().reshape(c, k, c, k)
+        sims  = gram[np.arange(c), :, np.arange(c), :]                    # (c, k, k)
+        pair_ok = upper[None] & valid[:, :, None] & valid[:, None, :]
+        pairs   = pair_ok.sum(axis=(1, 2))
+        dist    = np.where(pair_ok, 1.0 - sims, 0.0).sum(axis=(1, 2))
+        out[start:start + c] = np.divide(dist, pairs, out=np.zeros(c), where=pairs > 0)
+    return out
+
+
+# ─────────────────────────────────────────────
+# CATALOG-LEVEL METRICS
+# ─────────────────────────────────────────────
+def _counts(top_lists, n_items: int) -> np.ndarray:
+    rows = np.asarray(top_lists).ravel()
+    return np.bincount(rows[rows >= 0], minlength=n_items)
+
+
+def catalog_coverage(top_lists, n_items: int) -> float:
+    """Share of the catalog appearing in at least one list."""
+    return float(np.count_nonzero(_counts(top_lists, n_items)) / n_items)
+
+
+def gini_index(top_lists, n_items: int) -> float:
+    """
+    Gini coefficient of how often each catalog item is recommended
+    (0 = perfectly even exposure, → 1 = a few items take every slot).
+    """
+    counts = np.sort(_counts(top_lists, n_items)).astype(np.float64)
+    total  = counts.sum()
+    if total == 0:
+        return 0.0
+    ranks = np.arange(1, n_items + 1)
+    return float(np.sum((2 * ranks - n_items - 1) * counts) / (n_items * total))
+
+
+def novelty(top_lists, popularity) -> float:
+    """
+    Mean self-information −log2(p) of recommended items, where p is each
+    item's share of total popularity (e.g. `user_reviews`). Higher means
+    the lists surface less-reviewed games.
+    """
+    pop  = np.asarray(popularity, dtype=np.float64) + 1.0    # +1 smoothing for unreviewed games
+    info = -np.log2(pop / pop.sum())
+    rows = np.asarray(top_lists).ravel()
+    rows = rows[rows >= 0]
+    return float(info[rows].mean()) if rows.size else 0.0
@@ -0,0 +1,484 @@
+"""
+Versioned, memory-mapped model bundle for SteamLens.
+
+Layout on disk:
+
+    models/
+        CURRENT                 ← name of the active version
+        <version>/
+            manifest.json       ← format version, shapes, dtypes, columns
+            tfidf.data.npy      ← CSR arrays of the TF-IDF matrix (rows
+            tfidf.indices.npy     L2-normalized, float32 values by default)
+            tfidf.indptr.npy
+            games.<col>.npy     ← one array per game column
+            search.<key>.npy    ← title search index arrays
+            lookup.<key>.npy    ← title / app_id → row lookup (sorted keys)
+            neighbors.*.npy     ← optional derived indexes
+            tfidf_vectorizer.pkl
+
+Every array is a raw `.npy` loaded with `mmap_mode='r'`, so start-up only
+maps files and several Streamlit workers share the same pages through the
+OS page cache instead of each unpickling a private copy.
+
+The matrix is stored with pre-normalized rows, so cosine similarity is a
+plain sparse dot product, and with `values` of
+
+    float32   (default) half the float64 size, still memory-mapped
+    float64   sklearn's own precision (used for legacy pickle conversions)
+    uint16    values quantized to 16 / 8 bits against one scale, indices
+    uint8     stored as uint16 when the vocabulary fits; both are expanded
+              to float32 / int32 at load (scipy needs them), so they save
+              disk and transfer size rather than resident memory
+
+`accuracy_report` compares the top-K lists of each format against the
+float64 cosine baseline.
+
+    python model_bundle.py convert  --src . --out models
+    python model_bundle.py verify   --src . --out models
+    python model_bundle.py accuracy --src . --out models
+"""
+import argparse
+import json
+import os
+import shutil
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.preprocessing import normalize
+
+from recommender import LOOKUP_ARRAYS, build_lookup, lookup_arrays, restore_lookup
+from search import SEARCH_ARRAYS, SHORT_ARRAYS, build_search_index, restore_search_index
+
+FORMAT_NAME    = 'steamlens-bundle'
+FORMAT_VERSION = 2
+READ_VERSIONS  = (1, 2)         # v1: float64, unnormalized, no 'tfidf' manifest entry
+MATRIX_VALUES  = ('float32', 'float64', 'uint16', 'uint8')
+MODEL_DIR      = 'models'
+
+# Columns the app reads — nothing else is persisted
+GAME_COLUMNS = ['app_id', 'title', 'rating', 'positive_ratio', 'user_reviews', 'price_final',
+                'win', 'mac', 'linux']
+
+LEGACY_PICKLES = ('tfidf_matrix.pkl', 'tfidf_vectorizer.pkl', 'games_data.pkl')
+
+
+# ─────────────────────────────────────────────
+# VERSIONS
+# ─────────────────────────────────────────────
+def current_version(root: str = MODEL_DIR):
+    """Name of the active version, or None when no bundle is published."""
+    try:
+        with open(os.path.join(root, 'CURRENT'), encoding='utf-8') as f:
+            version = f.read().strip()
+    except FileNotFoundError:
+        return None
+    return version if os.path.isdir(os.path.join(root, version)) else None
+
+
+def _new_version(root: str) -> str:
+    version = time.strftime('%Y%m%d-%H%M%S')
+    suffix, name = 1, version
+    while os.path.exists(os.path.join(root, name)):
+        suffix += 1
+        name = f'{version}-{suffix}'
+    return name
+
+
+def list_versions(root: str = MODEL_DIR) -> list:
+    """Published version names under `root`, oldest first."""
+    if not os.path.isdir(root):
+        return []
+    return sorted(v for v in os.listdir(root)
+                  if not v.startswith('.') and os.path.isfile(os.path.join(root, v, 'manifest.json')))
+
+
+def prune_versions(root: str = MODEL_DIR, keep: int = 3) -> list:
+    """
+    Delete all but the newest `keep` versions (CURRENT is always kept).
+    Workers still mapping a deleted version keep their open pages.
+    """
+    current = current_version(root)
+    stale   = [v for v in list_versions(root)[:-max(keep, 1)] if v != current]
+    for v in stale:
+        shutil.rmtree(os.path.join(root, v))
+    return stale
+
+
+def publish(root: str, version: str) -> None:
+    """Point CURRENT at `version` atomically (write temp file, then rename)."""
+    tmp = os.path.join(root, f'.CURRENT.{os.getpid()}')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(version + '\n')
+    os.replace(tmp, os.path.join(root, 'CURRENT'))
+
+
+# ─────────────────────────────────────────────
+# WRITE
+# ─────────────────────────────────────────────
+def _save(path: str, name: str, arr: np.ndarray, manifest: dict) -> None:
+    arr = np.ascontiguousarray(arr)
+    np.save(os.path.join(path, f'{name}.npy'), arr, allow_pickle=False)
+    manifest['arrays'][name] = {'dtype': arr.dtype.str, 'shape': list(arr.shape)}
+
+
+def _texts(values) -> list:
+    """Values as they are stored and loaded back: missing ones become ''."""
+    return ['' if v is None or v != v else str(v) for v in values]
+
+
+def _save_strings(path: str, name: str, values, manifest: dict) -> None:
+    """Store strings as one UTF-8 blob plus offsets (object arrays can't be mapped)."""
+    encoded = [v.encode('utf-8') for v in _texts(values)]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    _save(path, f'{name}.utf8', np.frombuffer(b''.join(encoded), dtype=np.uint8), manifest)
+    _save(path, f'{name}.offsets', offsets, manifest)
+
+
+def _index_dtype(*sizes) -> type:
+    return np.int32 if max(sizes) < np.iinfo(np.int32).max else np.int64
+
+
+# ─────────────────────────────────────────────
+# MATRIX ENCODING
+# ─────────────────────────────────────────────
+def encode_matrix(tfidf_matrix, values: str = 'float32', normalized: bool = True):
+    """
+    `(data, indices, indptr, spec)` of the stored matrix: rows L2-normalized
+    (when `normalized`), values cast or quantized, smallest index dtypes.
+    """
+    if values not in MATRIX_VALUES:
+        raise ValueError(f'unknown matrix values {values!r}; expected one of {MATRIX_VALUES}')
+    X = sp.csr_matrix(tfidf_matrix, dtype=np.float64, copy=True)
+    if normalized:
+        X = normalize(X, norm='l2', copy=False)
+    spec = {'values': values, 'normalized': bool(normalized)}
+    if values in ('uint16', 'uint8'):
+        if X.nnz and X.data.min() < 0:
+            raise ValueError('quantized storage needs non-negative matrix values')
+        top   = np.iinfo(values).max
+        scale = float(X.data.max()) if X.nnz else 1.0
+        X.data = np.rint(X.data * (top / scale))
+        X.eliminate_zeros()                      # values below half a step
+        X.sort_indices()
+        spec['scale'] = scale / top
+        small   = X.shape[1] <= np.iinfo(np.uint16).max + 1
+        indices = X.indices.astype(np.uint16 if small else _index_dtype(X.nnz, *X.shape))
+        return X.data.astype(values), indices, X.indptr.astype(_index_dtype(X.nnz, *X.shape)), spec
+    X.sort_indices()
+    idx_dtype = _index_dtype(X.nnz, *X.shape)
+    return (X.data.astype(values, copy=False), X.indices.astype(idx_dtype, copy=False),
+            X.indptr.astype(idx_dtype, copy=False), spec)
+
+
+def decode_matrix(data, indices, indptr, shape, spec: dict) -> sp.csr_matrix:
+    """CSR matrix from stored arrays; float formats wrap them without copying."""
+    if 'scale' in spec:                          # quantized — expand for scipy
+        data    = data.astype(np.float32) * np.float32(spec['scale'])
+        indices = indices.astype(np.int32 if indptr.dtype == np.int32 else np.int64)
+    X = sp.csr_matrix((data, indices, indptr), shape=shape, copy=False)
+    X.has_sorted_indices = True
+    return X
+
+
+def write_bundle(root: str, tfidf_matrix, games: pd.DataFrame,
+                 vectorizer=None, search_index: dict = None,
+                 arrays: dict = None, publish_current: bool = True,
+                 extra: dict = None, values: str = 'float32', normalized: bool = True) -> str:
+    """
+    Write a new bundle version under `root` and return its name.
+
+    `arrays` holds optional derived indexes (e.g. the neighbor table) saved
+    under their dict keys; `extra` is merged into the manifest. `values`
+    and `normalized` choose the matrix storage (see `encode_matrix`).
+
+    The version is assembled in a hidden directory and renamed into place,
+    then CURRENT is switched — readers never see a half-written bundle.
+    """
+    os.makedirs(root, exist_ok=True)
+    version = _new_version(root)
+    tmp     = os.path.join(root, f'.tmp-{version}')
+    os.makedirs(tmp)
+
+    data, indices, indptr, spec = encode_matrix(tfidf_matrix, values, normalized)
+    manifest = {
+        'format':         FORMAT_NAME,
+        'format_version': FORMAT_VERSION,
+        'version':        version,
+        'created':        time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'n_games':        int(tfidf_matrix.shape[0]),
+        'n_features':     int(tfidf_matrix.shape[1]),
+        'tfidf':          spec,
+        'arrays':         {},
+        'columns':        {},
+    }
+    _save(tmp, 'tfidf.data',    data, manifest)
+    _save(tmp, 'tfidf.indices', indices, manifest)
+    _save(tmp, 'tfidf.indptr',  indptr, manifest)
+
+    for col in [c for c in GAME_COLUMNS if c in games.columns]:
+        s = games[col]
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            _save(tmp, f'games.{col}.codes', s.cat.codes.to_numpy(), manifest)
+            manifest['columns'][col] = {'kind': 'category',
+                                        'categories': [str(c) for c in s.cat.categories]}
+        elif pd.api.types.is_bool_dtype(s.dtype) or pd.api.types.is_numeric_dtype(s.dtype):
+            _save(tmp, f'games.{col}', s.to_numpy(), manifest)
+            manifest['columns'][col] = {'kind': 'array'}
+        else:
+            _save_strings(tmp, f'games.{col}', s.tolist(), manifest)
+            manifest['columns'][col] = {'kind': 'str'}
+
+    if search_index is None:
+        search_index = build_search_index(games['title'])
+    for key in SEARCH_ARRAYS + SHORT_ARRAYS:
+        if key in search_index:                 # indexes pickled before SHORT_ARRAYS lack them
+            _save(tmp, f'search.{key}', search_index[key], manifest)
+
+    lookup = lookup_arrays(_texts(games['title']), games['app_id'] if 'app_id' in games.columns else None)
+    for key, arr in lookup.items():
+        _save(tmp, f'lookup.{key}', arr, manifest)
+
+    for name, arr in (arrays or {}).items():
+        _save(tmp, name, arr, manifest)
+
+    if vectorizer is not None:
+        joblib.dump(vectorizer, os.path.join(tmp, 'tfidf_vectorizer.pkl'))
+        manifest['vectorizer'] = 'tfidf_vectorizer.pkl'
+    if extra:
+        manifest.update(extra)
+
+    with open(os.path.join(tmp, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.rename(tmp, os.path.join(root, version))
+    if publish_current:
+        publish(root, version)
+    return version
+
+
+# ─────────────────────────────────────────────
+# LOAD
+# ─────────────────────────────────────────────
+def _strings(arrays: dict, name: str) -> list:
+    blob    = arrays[f'{name}.utf8'].tobytes()
+    offsets = arrays[f'{name}.offsets'].tolist()
+    return [blob[a:b].decode('utf-8') for a, b in zip(offsets[:-1], offsets[1:])]
+
+
+def load_bundle(root: str = MODEL_DIR, version: str = None, mmap: bool = True) -> dict:
+    """
+    Load a bundle version (CURRENT by default) with memory-mapped arrays.
+
+    Returns a dict with `games`, `tfidf_matrix`, `lookup`, `search_index`,
+    `manifest` and `version`. A float TF-IDF matrix wraps the mapped arrays
+    directly; only the small game columns are materialized.
+    `manifest['tfidf']['normalized']` tells whether rows are unit length.
+    """
+    version = version or current_version(root)
+    if version is None:
+        raise FileNotFoundError(f'No published model bundle under {root!r}')
+    path = os.path.join(root, version)
+    with open(os.path.join(path, 'manifest.json'), encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('format') != FORMAT_NAME or manifest.get('format_version') not in READ_VERSIONS:
+        raise ValueError(f'Unsupported bundle format in {path!r}: '
+                         f'{manifest.get("format")} v{manifest.get("format_version")}')
+
+    mode   = 'r' if mmap else None
+    arrays = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode=mode, allow_pickle=False)
+              for name in manifest['arrays']}
+
+    manifest.setdefault('tfidf', {'values': str(arrays['tfidf.data'].dtype), 'normalized': False})
+    tfidf_matrix = decode_matrix(arrays['tfidf.data'], arrays['tfidf.indices'], arrays['tfidf.indptr'],
+                                 (manifest['n_games'], manifest['n_features']), manifest['tfidf'])
+
+    cols = {}
+    for col, spec in manifest['columns'].items():
+        if spec['kind'] == 'category':
+            cols[col] = pd.Categorical.from_codes(np.asarray(arrays[f'games.{col}.codes']),
+                                                  spec['categories'])
+        elif spec['kind'] == 'str':
+            cols[col] = _strings(arrays, f'games.{col}')
+        else:
+            cols[col] = np.asarray(arrays[f'games.{col}'])
+    games = pd.DataFrame(cols)
+
+    search_index = restore_search_index(
+        {k: arrays[f'search.{k}'] for k in SEARCH_ARRAYS + SHORT_ARRAYS if f'search.{k}' in arrays},
+        games['title'])
+
+    if 'lookup.title_order' in arrays:
+        lookup = restore_lookup({k: arrays[f'lookup.{k}'] for k in LOOKUP_ARRAYS if f'lookup.{k}' in arrays},
+                                games['title'])
+    else:                                       # bundles written before the lookup was stored
+        lookup = build_lookup(games)
+
+    return {
+        'games':        games,
+        'tfidf_matrix': tfidf_matrix,
+        'lookup':       lookup,
+        'search_index': search_index,
+        'arrays':       arrays,
+        'manifest':     manifest,
+        'version':      version,
+        'path':         path,
+    }
+
+
+def load_vectorizer(bundle: dict):
+    """Unpickle the fitted TfidfVectorizer stored with a bundle (build tools only)."""
+    name = bundle['manifest'].get('vectorizer')
+    if name is None:
+        raise FileNotFoundError(f'Bundle {bundle["version"]} has no vectorizer')
+    return joblib.load(os.path.join(bundle['path'], name))
+
+
+# ─────────────────────────────────────────────
+# CONVERT + VERIFY
+# ─────────────────────────────────────────────
+def convert_pickles(src: str = '.', out: str = MODEL_DIR) -> str:
+    """Write a bundle from the legacy joblib pickles in `src`."""
+    matrix, vectorizer, games = (joblib.load(os.path.join(src, f)) for f in LEGACY_PICKLES)
+    search_pkl = os.path.join(src, 'search_index.pkl')
+    search_index = joblib.load(search_pkl) if os.path.exists(search_pkl) else None
+    return write_bundle(out, matrix, games.reset_index(drop=True), vectorizer, search_index,
+                        values='float64', normalized=False)
+
+
+def verify_bundle(src: str = '.', out: str = MODEL_DIR, n_queries: int = 50,
+                  seed: int = 42) -> list:
+    """
+    Compare a bundle against the legacy pickles; returns a list of problems.
+
+    Checks the CSR arrays, every persisted game column, and that sampled
+    library queries produce identical top-10 recommendations.
+    """
+    from sklearn.metrics.pairwise import cosine_similarity
+    from recommender import build_filter_arrays, candidate_mask, top_n
+
+    games  = joblib.load(os.path.join(src, 'games_data.pkl')).reset_index(drop=True)
+    matrix = sp.csr_matrix(joblib.load(os.path.join(src, 'tfidf_matrix.pkl')))
+    matrix.sort_indices()
+    bundle = load_bundle(out)
+    bm, bg = bundle['tfidf_matrix'], bundle['games']
+
+    problems = []
+    if bm.shape != matrix.shape:
+        problems.append(f'matrix shape {bm.shape} != {matrix.shape}')
+        return problems
+    for part in ('data', 'indices', 'indptr'):
+        if not np.array_equal(getattr(bm, part), getattr(matrix, part)):
+            problems.append(f'tfidf.{part} differs')
+    for col in bg.columns:
+        a, b = bg[col].astype(str).to_numpy(), games[col].astype(str).to_numpy()
+        if not np.array_equal(a, b):
+            problems.append(f'column {col!r} differs')
+
+    rng = np.random.default_rng(seed)
+    fa, fb = build_filter_arrays(games), build_filter_arrays(bg)
+    for _ in range(n_queries):
+        lib = rng.choice(matrix.shape[0], size=int(rng.integers(1, 6)), replace=False)
+        plat, budget, ratio = rng.choice(['win', 'mac', 'linux']), rng.choice([5, 20, 60]), rng.choice([0, 50, 80])
+        picks = []
+        for X, fl in ((matrix, fa), (bm, fb)):
+            scores = cosine_similarity(np.asarray(X[lib].mean(axis=0)), X).ravel()
+            picks.append(top_n(scores, candidate_mask(fl, plat, budget, ratio, exclude=lib), 10).tolist())
+        if picks[0] != picks[1]:
+            problems.append(f'recommendations differ for library {lib.tolist()}')
+    return problems
+
+
+def _matrix_bytes(data, indices, indptr) -> int:
+    return int(data.nbytes + indices.nbytes + indptr.nbytes)
+
+
+def accuracy_report(tfidf_matrix, values=MATRIX_VALUES, n_queries: int = 200, k: int = 10,
+                    library_sizes=(1, 5), seed: int = 42) -> dict:
+    """
+    Top-`k` agreement of each storage format with the float64 baseline.
+
+    The baseline is `cosine_similarity` of the library centroid on the raw
+    float64 matrix (the original scoring); each format scores the same
+    sampled libraries with a plain dot product on its decoded, normalized
+    rows. Reports mean / min overlap@k, the largest score difference and
+    the stored matrix size per format.
+    """
+    from sklearn.metrics.pairwise import cosine_similarity
+    from recommender import top_n
+
+    X64 = sp.csr_matrix(tfidf_matrix, dtype=np.float64)
+    rng = np.random.default_rng(seed)
+    libs = [rng.choice(X64.shape[0], size=min(size, X64.shape[0]), replace=False)
+            for size in library_sizes for _ in range(n_queries)]
+    everything = np.ones(X64.shape[0], dtype=bool)
+
+    baseline = []
+    for lib in libs:
+        scores = cosine_similarity(np.asarray(X64[lib].mean(axis=0)), X64).ravel()
+        mask = everything.copy()
+        mask[lib] = False
+        baseline.append((top_n(scores, mask, k), scores, mask))
+
+    report = {'n_queries': len(libs), 'k': k, 'formats': {}}
+    for fmt in values:
+        data, indices, indptr, spec = encode_matrix(X64, fmt)
+        X = decode_matrix(data, indices, indptr, X64.shape, spec)
+        overlaps, errors = [], []
+        for lib, (base_rows, base_scores, mask) in zip(libs, baseline):
+            query  = np.asarray(X[lib].mean(axis=0)).ravel()
+            scores = X @ (query / max(np.linalg.norm(query), 1e-12))
+            rows   = top_n(scores, mask, k)
+            overlaps.append(len(np.intersect1d(rows, base_rows)) / max(len(base_rows), 1))
+            errors.append(float(np.abs(scores[base_rows] - base_scores[base_rows]).max(initial=0.0)))
+        report['formats'][fmt] = {'overlap_mean': float(np.mean(overlaps)),
+                                  'overlap_min':  float(np.min(overlaps)),
+                                  'max_score_error': float(np.max(errors)),
+                                  'matrix_mb': _matrix_bytes(data, indices, indptr) / 1e6}
+    report['baseline_mb'] = _matrix_bytes(X64.data, X64.indices, X64.indptr) / 1e6
+    return report
+
+
+def print_accuracy_report(report: dict) -> None:
+    print(f' Top-{report["k"]} overlap with the float64 cosine baseline '
+          f'({report["n_queries"]} libraries, baseline {report["baseline_mb"]:.1f} MB)')
+    for fmt, r in report['formats'].items():
+        print(f'   {fmt:8s} overlap mean {r["overlap_mean"]:.4f}  min {r["overlap_min"]:.2f}  '
+              f'max |Δscore| {r["max_score_error"]:.1e}  matrix {r["matrix_mb"]:.1f} MB')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='SteamLens model bundle tools')
+    parser.add_argument('command', choices=['convert', 'verify', 'accuracy'])
+    parser.add_argument('--src', default='.', help='directory holding the legacy .pkl files')
+    parser.add_argument('--out', default=MODEL_DIR, help='bundle root directory')
+    args = parser.parse_args()
+
+    if args.command == 'accuracy':
+        # float64 baseline: the legacy pickle if present, else the published bundle's matrix
+        pkl = os.path.join(args.src, 'tfidf_matrix.pkl')
+        if os.path.exists(pkl):
+            matrix = joblib.load(pkl)
+        else:
+            bundle = load_bundle(args.out)
+            matrix = bundle['tfidf_matrix']
+            if bundle['manifest']['tfidf']['values'] != 'float64':
+                print(f' Note: bundle {bundle["version"]} stores {bundle["manifest"]["tfidf"]["values"]}'
+                      ' values — the baseline is not the original float64 matrix.')
+        print_accuracy_report(accuracy_report(matrix))
+        return
+
+    if args.command == 'convert':
+        version = convert_pickles(args.src, args.out)
+        print(f'Wrote bundle {args.out}/{version}')
+    problems = verify_bundle(args.src, args.out)
+    for p in problems:
+        print(f'  ✗ {p}')
+    print(' Bundle matches pickles.' if not problems else f' {len(problems)} mismatches.')
+    raise SystemExit(1 if problems else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,215 @@
+"""
+Precomputed item-to-item neighbor index.
+
+An offline job stores each game's top-K most similar games as a compact
+int32 / float16 table. A library is then scored by merging its members'
+neighbor lists, and adding a game only touches that game's K entries
+instead of re-scoring the whole catalog.
+"""
+import numpy as np
+from sklearn.preprocessing import normalize
+
+from recommender import block_scores, top_n
+
+DEFAULT_K = 200
+
+
+# ─────────────────────────────────────────────
+# OFFLINE BUILD
+# ─────────────────────────────────────────────
+def build_neighbor_table(tfidf_matrix, k: int = DEFAULT_K, block_size: int = 256,
+                         progress: bool = False):
+    """
+    Top-`k` cosine neighbors of every row, self excluded.
+
+    Rows are scored `block_size` at a time as one sparse × dense product, so
+    peak memory is about N × block_size floats whatever the catalog size.
+    Returns `(idx, sim)` of shape (N, k): int32 rows and float16 scores,
+    best first.
+    """
+    X = normalize(tfidf_matrix.tocsr(), norm='l2', copy=True)
+    n = X.shape[0]
+    k = max(0, min(k, n - 1))
+    nbr_idx = np.zeros((n, k), dtype=np.int32)
+    nbr_sim = np.zeros((n, k), dtype=np.float16)
+    if k == 0:
+        return nbr_idx, nbr_sim
+
+    for start in range(0, n, block_size):
+        stop = min(start + block_size, n)
+        sims = block_scores(X, np.arange(start, stop))   # (B, N)
+        sims[np.arange(stop - start), np.arange(start, stop)] = -np.inf
+        part = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        part_sims = np.take_along_axis(sims, part, axis=1)
+        order = np.argsort(-part_sims, axis=1, kind='stable')
+        nbr_idx[start:stop] = np.take_along_axis(part, order, axis=1)
+        nbr_sim[start:stop] = np.take_along_axis(part_sims, order, axis=1)
+        if progress and (start // block_size) % 20 == 0:
+            print(f'   neighbors: {stop:,} / {n:,}')
+    return nbr_idx, nbr_sim
+
+
+def table_arrays(nbr_idx: np.ndarray, nbr_sim: np.ndarray) -> dict:
+    """Bundle array names for a neighbor table."""
+    return {'neighbors.idx': nbr_idx, 'neighbors.sim': nbr_sim}
+
+
+def table_from_bundle(bundle: dict):
+    """`(idx, sim)` from a loaded bundle, or None when it has no table."""
+    arrays = bundle['arrays']
+    if 'neighbors.idx' not in arrays:
+        return None
+    return arrays['neighbors.idx'], arrays['neighbors.sim']
+
+
+# ─────────────────────────────────────────────
+# INCREMENTAL LIBRARY SCORING
+# ─────────────────────────────────────────────
+def new_library_scores(n_games: int) -> dict:
+    """Empty running state: summed neighbor similarities per catalog row."""
+    return {'rows': [], 'scores': np.zeros(n_games, dtype=np.float32)}
+
+
+def sync_library_scores(state: dict, table, rows) -> dict:
+    """
+    Bring `state` in line with the library `rows`.
+
+    Only games added or removed since the last call are applied, each one
+    costing O(K); a different catalog size resets the state.
+    """
+    nbr_idx, nbr_sim = table
+    if state['scores'].size != nbr_idx.shape[0]:
+        state.update(new_library_scores(nbr_idx.shape[0]))
+    rows = list(dict.fromkeys(int(r) for r in rows))
+    if not rows:
+        state.update(new_library_scores(nbr_idx.shape[0]))
+        return state
+
+    current = set(state['rows'])
+    wanted  = set(rows)
+    scores  = state['scores']
+    for r in current - wanted:          # neighbor lists hold no duplicate rows
+        scores[nbr_idx[r]] -= nbr_sim[r]
+    for r in rows:
+        if r not in current:
+            scores[nbr_idx[r]] += nbr_sim[r]
+    state['rows'] = rows
+    return state
+
+
+def neighbor_scores(state: dict, tfidf_matrix):
+    """
+    `(scores, reached)` for the library held in `state`: merged neighbor
+    similarities divided by the library size and the centroid norm (the
+    exact centroid cosine restricted to the members' top-K lists), and the
+    mask of rows some member's list reaches.
+    """
+    rows = state['rows']
+    lib  = tfidf_matrix[rows]
+    centroid_norm = np.sqrt(max(float((lib @ lib.T).sum()), 1e-12)) / len(rows)
+    return state['scores'] / (len(rows) * centroid_norm), state['scores'] > 1e-6
+
+
+def neighbor_top_n(state: dict, tfidf_matrix, mask: np.ndarray, n: int):
+    """
+    Best `n` rows for the library held in `state`, or None to fall back.
+
+    Returns `(rows, scores)` from `neighbor_scores`, or None when the
+    filters leave fewer than `n` candidates in the merged lists — the
+    caller should then run the exact brute-force path.
+    """
+    if not state['rows']:
+        return None
+    scores, reached = neighbor_scores(state, tfidf_matrix)
+    pool = mask & reached
+    if np.count_nonzero(pool) < n:
+        return None
+    picked = top_n(scores, pool, n)
+    return picked, scores
+
+
+# ─────────────────────────────────────────────
+# INCREMENTAL CATALOG UPDATES
+# ─────────────────────────────────────────────
+def _keep_top(out_idx, out_sim, cand_idx, cand_sim, rows):
+    """Write the best `k` candidates of each of `rows` into the table, best first."""
+    k     = out_idx.shape[1]
+    part  = np.argpartition(-cand_sim, k - 1, axis=1)[:, :k]
+    p_sim = np.take_along_axis(cand_sim, part, axis=1)
+    order = np.argsort(-p_sim, axis=1, kind='stable')
+    out_idx[rows] = np.take_along_axis(np.take_along_axis(cand_idx, part, axis=1), order, axis=1)
+    out_sim[rows] = np.take_along_axis(p_sim, order, axis=1)
+
+
+def _rescore(out_idx, out_sim, X, rows, block_size: int):
+    """Exact top-K of `rows` against the whole normalized `X`."""
+    n = X.shape[0]
+    for start in range(0, rows.size, block_size):
+        block = rows[start:start + block_size]
+        sims  = block_scores(X, block)
+        sims[np.arange(len(block)), block] = -np.inf
+        _keep_top(out_idx, out_sim, np.broadcast_to(np.arange(n, dtype=np.int32), sims.shape), sims, block)
+
+
+def update_neighbor_table(nbr_idx: np.ndarray, nbr_sim: np.ndarray, tfidf_matrix,
+                          changed, block_size: int = 256):
+    """
+    Refresh a neighbor table after rows were replaced or appended.
+
+    `tfidf_matrix` is the updated catalog (old rows first, appended rows
+    after); `changed` lists every replaced or appended row. Changed rows and
+    rows whose lists pointed at a replaced row get an exact top-K again;
+    every other row only merges in the changed rows' scores. The result
+    equals a full rebuild at a cost of O(changed × K) re-scored rows.
+    """
+    X = normalize(tfidf_matrix.tocsr(), norm='l2', copy=True)
+    n, n_old, k = X.shape[0], nbr_idx.shape[0], nbr_idx.shape[1]
+    changed = np.unique(np.asarray(changed, dtype=np.int64))
+
+    out_idx = np.zeros((n, k), dtype=np.int32)
+    out_sim = np.zeros((n, k), dtype=np.float16)
+    out_idx[:n_old], out_sim[:n_old] = nbr_idx, nbr_sim
+    if k == 0 or changed.size == 0:
+        return out_idx, out_sim
+
+    # Changed rows and rows that lost a neighbor: exact recompute
+    stale   = np.flatnonzero(np.isin(out_idx[:n_old], changed).any(axis=1))
+    rescore = np.union1d(changed, stale)
+    _rescore(out_idx, out_sim, X, rescore, block_size)
+
+    # Other rows: merge the changed rows' new scores into existing lists
+    unchanged = np.setdiff1d(np.arange(n_old), rescore)
+    changed_t = X[changed].T.tocsc()
+    for start in range(0, unchanged.size, block_size):
+        rows    = unchanged[start:start + block_size]
+        cur_idx = out_idx[rows]
+        cur_sim = out_sim[rows].astype(np.float32)
+        new_sim = (X[rows] @ changed_t).toarray().astype(np.float32)
+        cand_idx = np.hstack([cur_idx, np.broadcast_to(changed.astype(np.int32), new_sim.shape)])
+        _keep_top(out_idx, out_sim, cand_idx, np.hstack([cur_sim, new_sim]), rows)
+    return out_idx, out_sim
+
+
+def remove_from_neighbor_table(nbr_idx: np.ndarray, nbr_sim: np.ndarray, tfidf_matrix,
+                               removed, block_size: int = 256):
+    """
+    Drop the catalog rows `removed` from a neighbor table.
+
+    `tfidf_matrix` is the catalog without them (remaining rows keep their
+    order). Rows whose lists held a removed row get an exact top-K again,
+    the rest only have their neighbor ids renumbered; the result equals a
+    full rebuild on the smaller catalog.
+    """
+    keep = np.ones(nbr_idx.shape[0], dtype=bool)
+    keep[np.asarray(removed, dtype=np.int64)] = False
+    new_id = np.cumsum(keep, dtype=np.int64) - 1          # old row → new row (valid where kept)
+    X = normalize(tfidf_matrix.tocsr(), norm='l2', copy=True)
+    k = min(nbr_idx.shape[1], max(0, X.shape[0] - 1))
+
+    old_idx = np.asarray(nbr_idx)[keep, :k]
+    out_idx = new_id[old_idx].astype(np.int32)
+    out_sim = np.asarray(nbr_sim)[keep, :k].copy()
+    if k:
+        stale = np.flatnonzero((~keep[old_idx]).any(axis=1))
+        _rescore(out_idx, out_sim, X, stale, block_size)
+    return out_idx, out_sim
@@ -0,0 +1,302 @@
+"""
+Streaming build pipeline: `games.csv` → cleaned, compactly typed games frame.
+
+The CSV is read twice in chunks with an explicit schema and never held
+whole in its raw form:
+
+1. `scan_games_csv` — one light pass for the global statistics the cleaning
+   needs (missing counts, price quartiles, min / max for normalization).
+2. `load_games`     — cleans, filters and normalizes each chunk with those
+   statistics, then concatenates the compact chunks.
+
+The result matches the notebook's original cleaning (fill → IQR price
+filter → min-max → rating score → price tier) with smaller dtypes.
+`feature_text` / `fit_tfidf` then turn the frame into the TF-IDF model,
+optionally with a multi-process map-reduce build for large catalogs.
+"""
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import CountVectorizer, TfidfTransformer, TfidfVectorizer
+
+CHUNK_SIZE = 50_000
+
+RATING_LEVELS = ['Overwhelmingly Positive', 'Very Positive', 'Positive', 'Mostly Positive',
+                 'Mixed', 'Mostly Negative', 'Negative', 'Very Negative',
+                 'Overwhelmingly Negative', 'Unknown']
+RATING_MAP = {
+    'Overwhelmingly Positive': 6, 'Very Positive': 5, 'Mostly Positive': 4,
+    'Mixed': 3, 'Mostly Negative': 2, 'Very Negative': 1,
+    'Overwhelmingly Negative': 0, 'Unknown': 2,
+}
+PRICE_BINS  = [-0.01, 0, 5, 15, 30, 60, 10000]
+PRICE_TIERS = ['free', 'budget', 'mid', 'standard', 'premium', 'luxury']
+
+# Read schema — numerics stay float64 inside a chunk (they may hold NaN and
+# feed the IQR / min-max maths) and are downcast once cleaned
+READ_DTYPES = {
+    'app_id': 'float64', 'AppID': 'float64', 'title': 'object', 'rating': 'object',
+    'positive_ratio': 'float64', 'user_reviews': 'float64', 'price_final': 'float64',
+    'price_original': 'float64', 'discount': 'float64',
+    'win': 'boolean', 'mac': 'boolean', 'linux': 'boolean', 'steam_deck': 'boolean',
+}
+# Stored schema
+GAME_DTYPES = {
+    'app_id': 'int32', 'user_reviews': 'int32',
+    'positive_ratio': 'float32', 'price_final': 'float32',
+    'price_original': 'float32', 'discount': 'float32',
+    'positive_ratio_norm': 'float32', 'user_reviews_norm': 'float32', 'price_norm': 'float32',
+    'rating_score': 'int8',
+    'win': 'bool', 'mac': 'bool', 'linux': 'bool', 'steam_deck': 'bool',
+    'rating':     pd.CategoricalDtype(RATING_LEVELS),
+    'price_tier': pd.CategoricalDtype(PRICE_TIERS),
+}
+NORM_COLUMNS = {'positive_ratio': 'positive_ratio_norm',
+                'user_reviews':   'user_reviews_norm',
+                'price_final':    'price_norm'}
+
+TFIDF_PARAMS = dict(
+    stop_words='english',
+    max_features=8000,      # larger vocab for 71K games
+    ngram_range=(1, 2),     # unigrams + bigrams
+    sublinear_tf=True,      # log(TF) dampening — better for skewed frequencies
+    min_df=2,               # ignore terms appearing in only 1 game
+)
+
+
+def rating_dtype(values: pd.Series) -> pd.CategoricalDtype:
+    """RATING_LEVELS plus any other labels in `values`, kept as written (as the notebook does)."""
+    extra = sorted(set(values.dropna().astype(str)) - set(RATING_LEVELS))
+    return pd.CategoricalDtype(RATING_LEVELS + extra)
+
+
+def _chunks(path: str, chunksize: int):
+    header = pd.read_csv(path, nrows=0).columns
+    dtypes = {c: t for c, t in READ_DTYPES.items() if c in header}
+    return pd.read_csv(path, chunksize=chunksize, dtype=dtypes)
+
+
+def _fill(chunk: pd.DataFrame) -> pd.DataFrame:
+    for col in ('positive_ratio', 'user_reviews', 'price_final'):
+        chunk[col] = chunk[col].fillna(0)
+    chunk['rating'] = chunk['rating'].fillna('Unknown')
+    if 'AppID' in chunk.columns and 'app_id' not in chunk.columns:
+        chunk = chunk.rename(columns={'AppID': 'app_id'})
+    return chunk
+
+
+# ─────────────────────────────────────────────
+# PASS 1 — STATISTICS
+# ─────────────────────────────────────────────
+def scan_games_csv(path: str = 'games.csv', chunksize: int = CHUNK_SIZE) -> dict:
+    """
+    Stream the CSV once and collect what cleaning needs globally.
+
+    Only the three numeric columns are kept (as float64 arrays, 24 bytes
+    per row); everything else is counted and dropped chunk by chunk.
+    """
+    rows, missing, columns = 0, None, None
+    numeric = {c: [] for c in NORM_COLUMNS}
+    for chunk in _chunks(path, chunksize):
+        rows   += len(chunk)
+        columns = list(chunk.columns)
+        counts  = chunk.isnull().sum()
+        missing = counts if missing is None else missing + counts
+        chunk   = _fill(chunk)
+        for c in numeric:
+            numeric[c].append(chunk[c].to_numpy(dtype=np.float64))
+    numeric = {c: np.concatenate(v) if v else np.zeros(0) for c, v in numeric.items()}
+
+    price  = pd.Series(numeric['price_final'])
+    q1, q3 = price.quantile(0.25), price.quantile(0.75)
+    limit  = q3 + 3 * (q3 - q1)
+    keep   = numeric['price_final'] <= limit
+
+    stats = {'rows': rows, 'columns': columns, 'missing': missing,
+             'price_q1': float(q1), 'price_q3': float(q3), 'price_limit': float(limit),
+             'rows_kept': int(keep.sum()), 'min': {}, 'max': {}}
+    for c, values in numeric.items():
+        kept = values[keep]
+        stats['min'][c] = float(kept.min()) if kept.size else 0.0
+        stats['max'][c] = float(kept.max()) if kept.size else 0.0
+    return stats
+
+
+# ─────────────────────────────────────────────
+# PASS 2 — CLEAN CHUNKS
+# ─────────────────────────────────────────────
+def cleaning_params(stats: dict) -> dict:
+    """The JSON-safe part of `stats` needed to clean later deltas the same way."""
+    return {'price_limit': stats['price_limit'], 'min': stats['min'], 'max': stats['max']}
+
+
+def clean_chunk(chunk: pd.DataFrame, stats: dict) -> pd.DataFrame:
+    """Fill, filter, normalize and downcast one chunk using global `stats`."""
+    chunk = _fill(chunk)
+    chunk = chunk[chunk['price_final'] <= stats['price_limit']].copy()
+
+    for col, out in NORM_COLUMNS.items():           # min-max, as MinMaxScaler
+        lo, hi = stats['min'][col], stats['max'][col]
+        scale  = (hi - lo) if hi > lo else 1.0
+        chunk[out] = (chunk[col] - lo) / scale
+
+    chunk['rating_score'] = chunk['rating'].map(RATING_MAP).fillna(3)
+    chunk['price_tier'] = pd.cut(chunk['price_final'], bins=PRICE_BINS, labels=PRICE_TIERS)
+
+    for col in ('win', 'mac', 'linux', 'steam_deck'):
+        if col in chunk.columns:
+            chunk[col] = chunk[col].fillna(False)
+    dtypes = {c: t for c, t in GAME_DTYPES.items() if c in chunk.columns}
+    return chunk.astype({**dtypes, 'rating': rating_dtype(chunk['rating'])})
+
+
+def load_games(path: str = 'games.csv', stats: dict = None,
+               chunksize: int = CHUNK_SIZE) -> pd.DataFrame:
+    """Cleaned games frame built chunk by chunk (runs `scan_games_csv` if needed)."""
+    stats  = stats or scan_games_csv(path, chunksize)
+    chunks = [clean_chunk(c, stats) for c in _chunks(path, chunksize)]
+    games  = pd.concat(chunks, ignore_index=True)     # chunks with different extra labels concat as object
+    games['rating'] = games['rating'].astype(rating_dtype(games['rating'])).cat.remove_unused_categories()
+    return games
+
+
+def load_delta(path: str, stats: dict, chunksize: int = CHUNK_SIZE):
+    """
+    `(games, dropped)` for an update CSV: the cleaned last row of each
+    `app_id`, and the app ids whose last row cleaning filtered out (price
+    above `stats['price_limit']`).
+    """
+    raw   = _fill(pd.concat(_chunks(path, chunksize), ignore_index=True))
+    raw   = raw.drop_duplicates('app_id', keep='last')     # the latest row wins, even if it is dropped
+    games = clean_chunk(raw, stats).reset_index(drop=True)
+    games['rating'] = games['rating'].cat.remove_unused_categories()
+    dropped = np.setdiff1d(raw['app_id'].to_numpy(dtype=np.int64), games['app_id'].to_numpy(dtype=np.int64))
+    return games, dropped
+
+
+# ─────────────────────────────────────────────
+# FEATURES
+# ─────────────────────────────────────────────
+def _category_strings(values: pd.Series):
+    """`(labels, codes)` of a column, with code -1 (missing) labelled 'nan' like `astype(str)`."""
+    values = values.astype('category')
+    labels = np.append(values.cat.categories.astype(str).to_numpy(dtype=object), 'nan')
+    return labels, values.cat.codes.to_numpy()
+
+
+def feature_text(games: pd.DataFrame) -> pd.Series:
+    """
+    Weighted feature string per game: title ×3, rating ×2, price tier.
+
+    The rating / tier suffix is built once per category pair and gathered
+    by code, so only the title part is assembled per row.
+    """
+    title = games['title'].astype(str).tolist()
+    r_labels, r_codes = _category_strings(games['rating'])
+    t_labels, t_codes = _category_strings(games['price_tier'])
+    suffixes = ' ' + r_labels[:, None] + ' ' + r_labels[:, None] + ' ' + t_labels[None, :]
+    suffix   = suffixes[r_codes, t_codes].tolist()
+    return pd.Series([f'{t} {t} {t}{s}' for t, s in zip(title, suffix)], index=games.index)
+
+
+def fit_tfidf(games: pd.DataFrame, n_jobs: int = None, chunksize: int = CHUNK_SIZE):
+    """
+    Fit the TF-IDF model on `games`; returns `(vectorizer, matrix)`.
+
+    `n_jobs > 1` runs the parallel build (`fit_tfidf_parallel`), which
+    gives the same vocabulary, IDF weights and matrix.
+    """
+    text = feature_text(games)
+    if n_jobs and n_jobs > 1 and len(text) > chunksize:
+        return fit_tfidf_parallel(text.tolist(), n_jobs, chunksize)
+    tfidf = TfidfVectorizer(**TFIDF_PARAMS)
+    return tfidf, tfidf.fit_transform(text)
+
+
+# ─────────────────────────────────────────────
+# PARALLEL TF-IDF BUILD
+# ─────────────────────────────────────────────
+def _term_counts(docs: list):
+    """Map step: `(terms, doc_freq, term_freq, counts)` of one chunk, terms sorted."""
+    params = TfidfVectorizer(**TFIDF_PARAMS).get_params()
+    counter = CountVectorizer(**{k: v for k, v in params.items() if k in CountVectorizer().get_params()})
+    counter.set_params(min_df=1, max_df=1.0, max_features=None, dtype=np.int64)
+    try:
+        X = counter.fit_transform(docs).tocsr()
+    except ValueError:                              # chunk without a single term
+        return (np.zeros(0, dtype=object), np.zeros(0, np.int64), np.zeros(0, np.int64),
+                sp.csr_matrix((len(docs), 0), dtype=np.int64))
+    terms = np.array(counter.get_feature_names_out(), dtype=object)
+    df = np.bincount(X.indices, minlength=len(terms)).astype(np.int64)
+    tf = np.asarray(X.sum(axis=0), dtype=np.int64).ravel()
+    return terms, df, tf, X
+
+
+def _remap_columns(X, local_terms: np.ndarray, terms: np.ndarray):
+    """Re-index a chunk's count matrix from its own terms to the global vocabulary."""
+    pos    = np.searchsorted(terms, local_terms)
+    pos    = np.minimum(pos, max(len(terms) - 1, 0))
+    colmap = np.where(terms[pos] == local_terms, pos, -1) if len(terms) else np.full(len(local_terms), -1)
+    cols   = colmap[X.indices]
+    keep   = cols >= 0
+    rows   = np.repeat(np.arange(X.shape[0]), np.diff(X.indptr))[keep]
+    indptr = np.zeros(X.shape[0] + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=X.shape[0]), out=indptr[1:])
+    return sp.csr_matrix((X.data[keep].astype(np.float64), cols[keep], indptr),
+                         shape=(X.shape[0], len(terms)))
+
+
+def merge_vocabulary(parts, n_docs: int):
+    """
+    Reduce step: merge per-chunk term counts and select the vocabulary as
+    `TfidfVectorizer.fit` does (min_df / max_df, then the `max_features`
+    most frequent terms, ties resolved by the same argsort over terms in
+    sorted order). Returns `(terms, doc_freq)` of the kept terms, sorted.
+    """
+    terms = np.concatenate([p[0] for p in parts])
+    terms, inverse = np.unique(terms, return_inverse=True)
+    df = np.zeros(len(terms), dtype=np.int64)
+    tf = np.zeros(len(terms), dtype=np.int64)
+    for part, idx in zip(parts, np.split(inverse.ravel(), np.cumsum([len(p[0]) for p in parts])[:-1])):
+        df[idx] += part[1]              # terms are unique within a chunk
+        tf[idx] += part[2]
+
+    min_df, max_df = TFIDF_PARAMS.get('min_df', 1), TFIDF_PARAMS.get('max_df', 1.0)
+    limit = TFIDF_PARAMS.get('max_features')
+    low   = min_df if isinstance(min_df, (int, np.integer)) else min_df * n_docs
+    high  = max_df if isinstance(max_df, (int, np.integer)) else max_df * n_docs
+    mask  = (df >= low) & (df <= high)
+    if limit is not None and mask.sum() > limit:
+        keep = np.zeros(len(df), dtype=bool)
+        keep[np.where(mask)[0][(-tf[mask]).argsort()[:limit]]] = True
+        mask = keep
+    return terms[mask], df[mask]
+
+
+def fit_tfidf_parallel(docs: list, n_jobs: int, chunksize: int = CHUNK_SIZE):
+    """
+    Map-reduce TF-IDF build over a process pool.
+
+    Workers tokenize and count their chunks in parallel (the expensive
+    part); the parent merges the counts, selects the vocabulary and
+    computes smoothed IDF weights exactly like `TfidfVectorizer.fit`, maps
+    each chunk's counts onto the final columns, stacks them and applies the
+    fitted TF-IDF weighting. Each document is tokenized once.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    chunks = [docs[i:i + chunksize] for i in range(0, len(docs), chunksize)]
+    with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+        parts = list(pool.map(_term_counts, chunks))
+    terms, df = merge_vocabulary(parts, len(docs))
+
+    vectorizer = TfidfVectorizer(**TFIDF_PARAMS)
+    vectorizer.vocabulary_ = {t: i for i, t in enumerate(terms.tolist())}
+    n = len(docs) + int(vectorizer.smooth_idf)
+    vectorizer.idf_ = np.log(n / (df.astype(np.float64) + float(vectorizer.smooth_idf))) + 1.0
+
+    weighting = TfidfTransformer(norm=vectorizer.norm, use_idf=True,
+                                 smooth_idf=vectorizer.smooth_idf, sublinear_tf=vectorizer.sublinear_tf)
+    weighting.idf_ = vectorizer.idf_
+    counts = sp.vstack([_remap_columns(p[3], p[0], terms) for p in parts], format='csr')
+    return vectorizer, weighting.transform(counts, copy=False)
@@ -0,0 +1,246 @@
+"""
+Shared recommendation helpers for the SteamLens app and the notebook.
+
+Everything here works on plain NumPy arrays prepared once at load time,
+so a query never has to walk the games DataFrame row by row.
+"""
+from collections.abc import Mapping
+
+import numpy as np
+import pandas as pd
+
+PLATFORMS     = ('win', 'mac', 'linux')
+LOOKUP_ARRAYS = ('title_order', 'app_ids', 'app_rows')
+
+
+# ─────────────────────────────────────────────
+# FILTER ARRAYS
+# ─────────────────────────────────────────────
+def build_filter_arrays(games: pd.DataFrame) -> dict:
+    """
+    Precompute the columns every filter reads as contiguous NumPy arrays.
+
+    Platforms missing from the frame are treated as supported, matching the
+    old `g.get(platform, True)` behaviour.
+    """
+    n = len(games)
+    arrays = {
+        'price': games['price_final'].to_numpy(dtype=np.float64),
+        'ratio': (games['positive_ratio'].to_numpy(dtype=np.float64)
+                  if 'positive_ratio' in games.columns else np.zeros(n)),
+    }
+    for plat in PLATFORMS:
+        if plat in games.columns:
+            arrays[plat] = games[plat].fillna(False).to_numpy(dtype=bool)
+        else:
+            arrays[plat] = np.ones(n, dtype=bool)
+    return arrays
+
+
+def candidate_mask(arrays: dict, platform: str = 'win',
+                   max_price: float = np.inf, min_ratio: float = 0,
+                   exclude=()) -> np.ndarray:
+    """Boolean mask of rows passing platform, price and approval filters."""
+    mask = arrays['price'] <= max_price
+    mask &= arrays['ratio'] >= min_ratio
+    if platform in arrays:
+        mask &= arrays[platform]
+    exclude = np.asarray(list(exclude), dtype=np.int64)
+    if exclude.size:
+        mask[exclude] = False
+    return mask
+
+
+# ─────────────────────────────────────────────
+# LOOKUP INDEX
+# ─────────────────────────────────────────────
+def build_lookup(games: pd.DataFrame) -> dict:
+    """
+    Title → row and app_id → row mappings for O(1) resolution.
+
+    Rows are positions in `games` (and in the TF-IDF matrix). Duplicate
+    titles keep every row in ascending order; the first one is canonical.
+    """
+    by_title = {}
+    for row, title in enumerate(games['title'].astype(str).tolist()):
+        by_title.setdefault(title, []).append(row)
+    by_app = {}
+    if 'app_id' in games.columns:
+        for row, app_id in enumerate(games['app_id'].tolist()):
+            by_app.setdefault(int(app_id), row)
+    return {'title': by_title, 'app_id': by_app}
+
+
+def lookup_arrays(titles, app_ids=None) -> dict:
+    """
+    `build_lookup` as sorted arrays for the bundle: the row order of the
+    titles (stable, so equal titles keep ascending rows), and the sorted
+    distinct app ids with the first row of each.
+    """
+    out = {'title_order': np.argsort(np.asarray(titles, dtype=object), kind='stable').astype(np.int32)}
+    if app_ids is not None:
+        out['app_ids'], first = np.unique(np.asarray(app_ids, dtype=np.int64), return_index=True)
+        out['app_rows'] = first.astype(np.int32)
+    return out
+
+
+class SortedLookup(Mapping):
+    """
+    Read-only `key → rows` mapping over sorted keys, answered by binary
+    search. `unique=True` maps each key to a single row (the app id index).
+    """
+
+    def __init__(self, keys, rows, unique: bool = False):
+        self.sorted_keys = keys
+        self.rows        = rows
+        self.unique      = unique
+
+    def _span(self, key):
+        try:
+            return (int(np.searchsorted(self.sorted_keys, key, side='left')),
+                    int(np.searchsorted(self.sorted_keys, key, side='right')))
+        except (TypeError, ValueError):          # a key the sorted keys can't be compared with
+            return 0, 0
+
+    def __getitem__(self, key):
+        lo, hi = self._span(key)
+        if lo == hi:
+            raise KeyError(key)
+        return int(self.rows[lo]) if self.unique else self.rows[lo:hi].tolist()
+
+    def _distinct(self) -> np.ndarray:
+        keys = self.sorted_keys
+        if len(keys) == 0:
+            return keys[:0]
+        first = np.ones(len(keys), dtype=bool)
+        first[1:] = keys[1:] != keys[:-1]
+        return keys[first]
+
+    def __iter__(self):
+        return iter(self._distinct().tolist())
+
+    def __len__(self) -> int:
+        return len(self._distinct())
+
+
+def restore_lookup(arrays: dict, titles) -> dict:
+    """`build_lookup` from its stored `LOOKUP_ARRAYS` and the titles, without a per-row loop."""
+    order  = np.asarray(arrays['title_order'])
+    titles = np.asarray(titles, dtype=object)
+    by_app = (SortedLookup(np.asarray(arrays['app_ids']), np.asarray(arrays['app_rows']), unique=True)
+              if 'app_ids' in arrays else {})
+    return {'title': SortedLookup(titles[order], order), 'app_id': by_app}
+
+
+def title_rows(lookup: dict, titles) -> list:
+    """Canonical row for each known title, in library order."""
+    return [lookup['title'][t][0] for t in titles if t in lookup['title']]
+
+
+def owned_rows(lookup: dict, titles) -> set:
+    """Every row sharing a title with the library — excluded from results."""
+    rows = set()
+    for t in titles:
+        rows.update(lookup['title'].get(t, ()))
+    return rows
+
+
+# ─────────────────────────────────────────────
+# TOP-N SELECTION
+# ─────────────────────────────────────────────
+def top_n(scores: np.ndarray, mask: np.ndarray, n: int) -> np.ndarray:
+    """
+    Row indices of the `n` best-scoring rows allowed by `mask`, best first.
+
+    Uses `argpartition` over the surviving candidates only, so the cost is
+    O(N) whatever the filters and never a full sort of the catalog.
+    Equal scores are ordered by row index, at the cut too, so the result
+    does not depend on how the partition split a tie.
+    """
+    cand = np.flatnonzero(mask)
+    if n <= 0 or cand.size == 0:
+        return cand[:0]
+    cand_scores = scores[cand]
+    if cand.size > n:
+        kth  = -np.partition(-cand_scores, n - 1)[n - 1]
+        keep = cand_scores >= kth
+        cand, cand_scores = cand[keep], cand_scores[keep]
+    order = np.lexsort((cand, -cand_scores))
+    return cand[order[:n]]
+
+
+# ─────────────────────────────────────────────
+# BATCH SCORING
+# ─────────────────────────────────────────────
+def block_scores(X, rows) -> np.ndarray:
+    """
+    Cosine scores of `rows` against every row of the L2-normalized `X`.
+
+    One sparse × dense product per block: returns a dense (len(rows), N)
+    float32 array, so memory is bounded by the block size.
+    """
+    return np.ascontiguousarray((X @ X[rows].T.toarray()).T, dtype=np.float32)
+
+
+def _batch_top_k(X, indices, k, mask, exclude_self, block_size):
+    indices = np.asarray(indices, dtype=np.int64)
+    out_idx = np.full((len(indices), k), -1, dtype=np.int64)
+    out_sim = np.full((len(indices), k), -np.inf, dtype=np.float32)
+    for start in range(0, len(indices), block_size):
+        rows = indices[start:start + block_size]
+        sims = block_scores(X, rows)
+        if mask is not None:
+            sims[:, ~mask] = -np.inf
+        if exclude_self:
+            sims[np.arange(len(rows)), rows] = -np.inf
+        kk   = min(k, sims.shape[1])
+        part = np.argpartition(-sims, kk - 1, axis=1)[:, :kk]
+        part_sims = np.take_along_axis(sims, part, axis=1)
+        order = np.lexsort((part, -part_sims), axis=1)
+        out_idx[start:start + len(rows), :kk] = np.take_along_axis(part, order, axis=1)
+        out_sim[start:start + len(rows), :kk] = np.take_along_axis(part_sims, order, axis=1)
+    out_idx[~np.isfinite(out_sim)] = -1     # slots with no allowed candidate
+    return out_idx, out_sim
+
+
+_WORKER = {}
+
+
+def _init_worker(X, mask):
+    _WORKER['X'], _WORKER['mask'] = X, mask
+
+
+def _run_worker(args):
+    indices, k, exclude_self, block_size = args
+    return _batch_top_k(_WORKER['X'], indices, k, _WORKER['mask'], exclude_self, block_size)
+
+
+def recommend_batch(tfidf_matrix, indices, k: int = 10, mask: np.ndarray = None,
+                    exclude_self: bool = True, block_size: int = 256,
+                    n_jobs: int = None, normalized: bool = False):
+    """
+    Top-`k` neighbors for many single-game queries at once.
+
+    Queries are scored `block_size` at a time (one sparse product per block,
+    memory ~ block_size × N floats) with a per-row `argpartition`.
+    `mask` restricts candidates for every query (see `candidate_mask`);
+    `n_jobs > 1` shards the queries over a process pool. Set
+    `normalized=True` when rows are already unit length to skip the copy.
+
+    Returns `(rows, scores)`, both (len(indices), k), best first; slots
+    without an allowed candidate hold row -1 and score -inf.
+    """
+    from sklearn.preprocessing import normalize
+
+    X = tfidf_matrix.tocsr() if normalized else normalize(tfidf_matrix.tocsr(), norm='l2')
+    indices = np.asarray(indices, dtype=np.int64)
+    if not n_jobs or n_jobs == 1 or len(indices) <= block_size:
+        return _batch_top_k(X, indices, k, mask, exclude_self, block_size)
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    shards = [indices[i:i + block_size * 4] for i in range(0, len(indices), block_size * 4)]
+    with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker,
+                             initargs=(X, mask)) as pool:
+        parts = list(pool.map(_run_worker, [(s, k, exclude_self, block_size) for s in shards]))
+    return (np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts]))
@@ -0,0 +1,150 @@
+"""
+Title search index for the SteamLens search box.
+
+A sorted prefix array answers exact and prefix queries with two binary
+searches; a character-trigram inverted index narrows substring queries to a
+handful of candidate rows before the final `in` check. Queries shorter than
+a trigram (the first keystrokes in the search box) read their rows straight
+from unigram / bigram posting lists, so no query scans the whole catalog.
+"""
+import numpy as np
+
+GRAM = 3
+
+# Arrays that fully describe an index; the normalized titles are rebuilt.
+# SHORT_ARRAYS (1–2 character postings) are missing from older bundles.
+SEARCH_ARRAYS = ('prefix_order', 'grams', 'gram_offsets', 'gram_rows')
+SHORT_ARRAYS  = ('short_grams', 'short_offsets', 'short_rows')
+
+
+def normalize(title) -> str:
+    """Case-folded title used for matching (missing titles never match)."""
+    if title is None or title != title:   # None / NaN
+        return ''
+    return str(title).lower()
+
+
+def _grams(text: str, n: int = GRAM) -> set:
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+def _csr_postings(postings: dict, width: int):
+    """`(grams, offsets, rows)` of a gram → ascending rows dict."""
+    grams   = sorted(postings)
+    lengths = np.fromiter((len(postings[g]) for g in grams), dtype=np.int64, count=len(grams))
+    offsets = np.zeros(len(grams) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    rows = np.fromiter((r for g in grams for r in postings[g]), dtype=np.int32, count=int(offsets[-1]))
+    return np.array(grams, dtype=f'<U{width}'), offsets, rows
+
+
+# ─────────────────────────────────────────────
+# BUILD
+# ─────────────────────────────────────────────
+def build_search_index(titles) -> dict:
+    """
+    Build the prefix array and trigram postings over `titles`.
+
+    Postings are stored CSR-style: `grams` (sorted), `gram_offsets` and
+    `gram_rows`, so the rows holding gram `grams[i]` are
+    `gram_rows[gram_offsets[i]:gram_offsets[i + 1]]`, ascending. The
+    `short_*` arrays hold the same for every 1- and 2-character substring.
+    """
+    norm = np.array([normalize(t) for t in titles], dtype=object)
+
+    prefix_order = np.argsort(norm, kind='stable').astype(np.int32)
+    prefix_keys  = norm[prefix_order]
+
+    postings, short = {}, {}
+    for row, text in enumerate(norm):
+        for g in _grams(text):
+            postings.setdefault(g, []).append(row)
+        for g in _grams(text, 1) | _grams(text, 2):
+            short.setdefault(g, []).append(row)
+    grams, offsets, rows = _csr_postings(postings, GRAM)
+    short_grams, short_offsets, short_rows = _csr_postings(short, GRAM - 1)
+
+    return {
+        'norm':          norm,
+        'prefix_order':  prefix_order,
+        'prefix_keys':   prefix_keys,
+        'grams':         grams,
+        'gram_offsets':  offsets,
+        'gram_rows':     rows,
+        'short_grams':   short_grams,
+        'short_offsets': short_offsets,
+        'short_rows':    short_rows,
+    }
+
+
+def restore_search_index(arrays: dict, titles) -> dict:
+    """Rebuild a full index from its stored `SEARCH_ARRAYS` (+ `SHORT_ARRAYS`) and the titles."""
+    norm  = np.array([normalize(t) for t in titles], dtype=object)
+    index = {k: arrays[k] for k in SEARCH_ARRAYS + SHORT_ARRAYS if k in arrays}
+    index['norm']        = norm
+    index['prefix_keys'] = norm[np.asarray(index['prefix_order'])]
+    return index
+
+
+# ─────────────────────────────────────────────
+# QUERY
+# ─────────────────────────────────────────────
+def _postings(index: dict, gram: str) -> np.ndarray:
+    if len(gram) < GRAM:
+        grams, offsets, rows = index['short_grams'], index['short_offsets'], index['short_rows']
+    else:
+        grams, offsets, rows = index['grams'], index['gram_offsets'], index['gram_rows']
+    i = int(np.searchsorted(grams, gram))
+    if i == len(grams) or grams[i] != gram:
+        return rows[:0]
+    return rows[offsets[i]:offsets[i + 1]]
+
+
+def _substring_candidates(index: dict, q: str):
+    """Rows that may contain `q`, ascending (for short `q`, exactly the rows that do)."""
+    if len(q) < GRAM:
+        if 'short_grams' in index:
+            return _postings(index, q)
+        return range(len(index['norm']))     # bundle without short postings — scan in row order
+    lists = sorted((_postings(index, g) for g in _grams(q)), key=len)
+    cand = lists[0]
+    for other in lists[1:]:
+        if not cand.size:
+            break
+        cand = np.intersect1d(cand, other, assume_unique=True)
+    return cand
+
+
+def search_titles(index: dict, query: str, limit: int = 5) -> list:
+    """
+    Row indices of up to `limit` titles containing `query` (case-insensitive).
+
+    Exact matches rank first, then titles starting with the query, then
+    other substring matches; rows keep catalog order within each group.
+    """
+    q = normalize(query)
+    if not q or limit <= 0:
+        return []
+
+    keys, order = index['prefix_keys'], index['prefix_order']
+    lo       = int(np.searchsorted(keys, q, side='left'))
+    hi_exact = int(np.searchsorted(keys, q, side='right'))
+    hi       = int(np.searchsorted(keys, q + '\U0010ffff', side='left'))
+
+    hits = np.sort(order[lo:hi_exact]).tolist()
+    if len(hits) < limit:
+        hits += np.sort(order[hi_exact:hi])[:limit - len(hits)].tolist()
+    if len(hits) >= limit:
+        return hits[:limit]
+
+    # Prefix hits are a subset of substring hits — skip them here
+    seen  = set(hits)
+    norm  = index['norm']
+    exact = len(q) < GRAM and 'short_grams' in index      # postings already contain q
+    for row in _substring_candidates(index, q):
+        row = int(row)
+        if row not in seen and (exact or q in norm[row]):
+            hits.append(row)
+            if len(hits) == limit:
+                break
+    return hits
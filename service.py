@@ -0,0 +1,305 @@
+"""
+Headless recommendation service: a small asyncio HTTP/1.1 JSON API over
+`engine`.
+
+The event loop only parses requests; every search or scoring call runs in
+a thread or process pool, so slow queries never block other clients. Each
+process memory-maps the same published bundle, so several service
+instances (or `--executor process` workers) behind a load balancer share
+one copy of the model pages. A newly published `models/CURRENT` is picked
+up on the next request.
+
+Recommendation candidates are cached per library (see `cache`); pass
+`--cache-db` to share them between processes through a SQLite file.
+
+    python service.py --port 8502 --workers 4
+    STEAMLENS_API_URL=http://localhost:8502 streamlit run app.py
+
+Endpoints (JSON in, JSON out):
+
+    GET  /health                       {"status": "ok", "version": ...}
+    GET  /info                         version, engines, catalog stats
+    GET  /cache                        result-cache counters and size
+    GET  /metrics                      stage timers + counters, Prometheus text
+                                       (with STEAMLENS_METRICS=1; per worker
+                                       process under --executor process)
+    GET  /search?q=portal&limit=5      also POST {"query", "limit"}
+    POST /recommend                    {"library": [...], "platform", "budget",
+                                        "min_ratio", "n", "engine", "weights", "blend"}
+                                       ("weights": {field: weight}, field-model
+                                        bundles only; names and defaults in /info;
+                                        "blend": true or {"similarity", "quality",
+                                        "popularity", "price", "diversity"} re-ranks)
+    POST /batch                        {"requests": [<recommend body>, ...]}
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+import engine
+import instrument
+from cache import DEFAULT_MAX_BYTES, make_cache
+from model_bundle import MODEL_DIR, current_version
+from rerank import blend_weights
+
+MAX_BODY  = 1 << 20
+MAX_BATCH = 1000
+
+_ROOT   = MODEL_DIR
+_MODELS = None
+_CACHE  = None
+
+
+class RequestError(ValueError):
+    """A client error, answered with HTTP 400."""
+
+
+# ─────────────────────────────────────────────
+# WORKER SIDE  (runs inside the pool)
+# ─────────────────────────────────────────────
+def _init_worker(root: str, cache_db: str = None, cache_bytes: int = DEFAULT_MAX_BYTES):
+    global _ROOT, _MODELS, _CACHE
+    _ROOT, _MODELS = root, engine.load_models(root)
+    _CACHE = make_cache(cache_db, max_bytes=cache_bytes)
+
+
+def _models() -> dict:
+    """Loaded models, reloaded when a new bundle version has been published."""
+    global _MODELS
+    version = current_version(_ROOT)
+    if _MODELS is None or (version and version != _MODELS['version']):
+        _MODELS = engine.load_models(_ROOT, version)
+    return _MODELS
+
+
+def _weights_arg(models: dict, weights):
+    if weights is None:
+        return None
+    if not isinstance(weights, dict):
+        raise RequestError('"weights" must be an object of field → weight')
+    names = models['fields']['names'] if models['fields'] is not None else []
+    unknown = sorted(set(weights) - set(names))
+    if unknown:
+        raise RequestError(f'unknown fields {unknown} (this bundle has {names or "no field weights"})')
+    try:
+        weights = {f: float(w) for f, w in weights.items()}
+    except (TypeError, ValueError):
+        raise RequestError('field weights must be numbers') from None
+    if not all(0 <= w < float('inf') for w in weights.values()):
+        raise RequestError('field weights must be finite and >= 0')
+    return weights
+
+
+def _blend_arg(blend):
+    if blend is None or blend is False:
+        return None
+    if blend is True:
+        return {}
+    if not isinstance(blend, dict):
+        raise RequestError('"blend" must be true or an object of blend weights')
+    try:
+        blend_weights(blend)
+    except (TypeError, ValueError) as exc:
+        raise RequestError(str(exc)) from None
+    return blend
+
+
+def _recommend_args(models: dict, body: dict) -> dict:
+    if not isinstance(body, dict):
+        raise RequestError('recommend request must be a JSON object')
+    library = body.get('library')
+    if not isinstance(library, list) or not all(isinstance(t, str) for t in library):
+        raise RequestError('"library" must be a list of game titles')
+    try:
+        args = {'library_titles': tuple(library),
+                'platform':  str(body.get('platform', 'win')),
+                'budget':    float(body.get('budget', 60)),
+                'min_ratio': float(body.get('min_ratio', 50)),
+                'n':         int(body.get('n', 6)),
+                'engine':    str(body.get('engine', 'exact'))}
+    except (TypeError, ValueError) as exc:
+        raise RequestError(str(exc)) from None
+    if args['engine'] not in engine.ENGINES:
+        raise RequestError(f'unknown engine {args["engine"]!r}')
+    if not 0 < args['n'] <= 100:
+        raise RequestError('"n" must be between 1 and 100')
+    args['weights'] = _weights_arg(models, body.get('weights'))
+    args['blend']   = _blend_arg(body.get('blend'))
+    return args
+
+
+def handle_call(op: str, body: dict):
+    """Run one API call against the loaded models; returns a JSON-ready dict."""
+    models = _models()
+    if op == 'health':
+        return {'status': 'ok', 'version': models['version']}
+    if op == 'info':
+        return engine.info(models)
+    if op == 'cache':
+        return _CACHE.stats()
+    if op == 'metrics':
+        return instrument.prometheus_text()
+    if op == 'search':
+        query = str(body.get('query', body.get('q', '')))
+        try:
+            limit = min(max(int(body.get('limit', 5)), 1), 100)
+        except (TypeError, ValueError):
+            raise RequestError('"limit" must be an integer') from None
+        return {'version': models['version'], 'results': engine.search(models, query, limit)}
+    if op == 'recommend':
+        return {'version': models['version'],
+                'results': engine.recommend(models, **_recommend_args(models, body), cache=_CACHE)}
+    if op == 'batch':
+        queries = body.get('requests')
+        if not isinstance(queries, list) or len(queries) > MAX_BATCH:
+            raise RequestError(f'"requests" must be a list of at most {MAX_BATCH} recommend bodies')
+        return {'version': models['version'],
+                'results': engine.recommend_many(models, [_recommend_args(models, q) for q in queries],
+                                                 cache=_CACHE)}
+    raise KeyError(op)
+
+
+# ─────────────────────────────────────────────
+# HTTP SIDE  (event loop)
+# ─────────────────────────────────────────────
+ROUTES = {('GET', '/health'):     'health',
+          ('GET', '/info'):       'info',
+          ('GET', '/cache'):      'cache',
+          ('GET', '/metrics'):    'metrics',
+          ('GET', '/search'):     'search',
+          ('POST', '/search'):    'search',
+          ('POST', '/recommend'): 'recommend',
+          ('POST', '/batch'):     'batch'}
+
+
+async def _read_request(reader):
+    """`(method, path, query, headers, body)` or None when the client closed."""
+    line = await reader.readline()
+    if not line:
+        return None
+    try:
+        method, target, _ = line.decode('latin-1').split(' ', 2)
+    except ValueError:
+        raise RequestError('malformed request line') from None
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get('content-length') or 0)
+    except ValueError:
+        raise RequestError('bad Content-Length') from None
+    if not 0 <= length <= MAX_BODY:
+        raise RequestError('request body too large')
+    body = await reader.readexactly(length) if length else b''
+    url  = urlsplit(target)
+    return method.upper(), url.path, parse_qs(url.query), headers, body
+
+
+def _response(status: HTTPStatus, payload, keep_alive: bool) -> bytes:
+    if isinstance(payload, str):
+        data, kind = payload.encode(), 'text/plain; version=0.0.4'
+    else:
+        data, kind = json.dumps(payload).encode(), 'application/json'
+    head = (f'HTTP/1.1 {status.value} {status.phrase}\r\n'
+            f'Content-Type: {kind}\r\n'
+            f'Content-Length: {len(data)}\r\n'
+            f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n')
+    return head.encode() + data
+
+
+class Service:
+    """Event-loop front end dispatching API calls to an executor."""
+
+    def __init__(self, root: str = MODEL_DIR, executor: str = 'thread', workers: int = None,
+                 cache_db: str = None, cache_bytes: int = DEFAULT_MAX_BYTES):
+        workers = workers or min(8, os.cpu_count() or 1)
+        if executor == 'process':
+            self.pool = ProcessPoolExecutor(workers, initializer=_init_worker,
+                                            initargs=(root, cache_db, cache_bytes))
+        else:
+            _init_worker(root, cache_db, cache_bytes)   # threads share models and cache
+            self.pool = ThreadPoolExecutor(workers)
+
+    async def dispatch(self, method: str, path: str, query: dict, body: bytes):
+        op = ROUTES.get((method, path))
+        if op is None:
+            return HTTPStatus.NOT_FOUND, {'error': f'no route for {method} {path}'}
+        try:
+            payload = json.loads(body) if body else {}
+        except ValueError:
+            return HTTPStatus.BAD_REQUEST, {'error': 'body is not valid JSON'}
+        if not isinstance(payload, dict):
+            return HTTPStatus.BAD_REQUEST, {'error': 'body must be a JSON object'}
+        payload.update({k: v[-1] for k, v in query.items()})
+
+        loop = asyncio.get_running_loop()
+        try:
+            result = await loop.run_in_executor(self.pool, partial(handle_call, op, payload))
+        except RequestError as exc:
+            return HTTPStatus.BAD_REQUEST, {'error': str(exc)}
+        except Exception as exc:                          # noqa: BLE001 — report, keep serving
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {'error': f'{type(exc).__name__}: {exc}'}
+        return HTTPStatus.OK, result
+
+    async def handle_client(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await _read_request(reader)
+                except RequestError as exc:
+                    writer.write(_response(HTTPStatus.BAD_REQUEST, {'error': str(exc)}, False))
+                    break
+                if request is None:
+                    break
+                method, path, query, headers, body = request
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                status, payload = await self.dispatch(method, path, query, body)
+                writer.write(_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = '127.0.0.1', port: int = 8502):
+        server = await asyncio.start_server(self.handle_client, host, port)
+        print(f' SteamLens API on http://{host}:{port}')
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve SteamLens recommendations over HTTP')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8502)
+    parser.add_argument('--models', default=MODEL_DIR, help='bundle root directory')
+    parser.add_argument('--executor', choices=('thread', 'process'), default='thread')
+    parser.add_argument('--workers', type=int, default=None, help='pool size (default: min(8, CPUs))')
+    parser.add_argument('--cache-db', default=None, help='SQLite file for a result cache shared by workers')
+    parser.add_argument('--cache-mb', type=int, default=DEFAULT_MAX_BYTES >> 20, help='result cache budget (MB)')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(name)s %(message)s')
+    service = Service(args.models, args.executor, args.workers,
+                      cache_db=args.cache_db, cache_bytes=args.cache_mb << 20)
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.pool.shutdown(cancel_futures=True)
+
+
+if __name__ == '__main__':
+    main()
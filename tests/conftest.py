@@ -0,0 +1,16 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+
+@pytest.fixture(scope='session')
+def models(tmp_path_factory):
+    """Engine models over a small synthetic catalog bundle (all indexes and priors)."""
+    import benchmark
+    import engine
+    workdir = str(tmp_path_factory.mktemp('catalog'))
+    benchmark.build_catalog(1500, workdir, neighbor_k=30)
+    return engine.load_models(f'{workdir}/models')
@@ -0,0 +1,40 @@
+import json
+import os
+
+import pytest
+
+import benchmark
+import model_bundle
+from recommender import SortedLookup, build_lookup, owned_rows, title_rows
+
+
+@pytest.fixture
+def bundle_root(tmp_path):
+    benchmark.build_catalog(400, str(tmp_path), neighbor_k=0, with_ann=False)
+    return str(tmp_path / 'models')
+
+
+def test_stored_lookup_matches_build_lookup(bundle_root):
+    bundle = model_bundle.load_bundle(bundle_root)
+    lookup, expected = bundle['lookup'], build_lookup(bundle['games'])
+    assert isinstance(lookup['title'], SortedLookup)
+    assert dict(lookup['title']) == expected['title']
+    assert dict(lookup['app_id']) == expected['app_id']
+    assert any(len(rows) > 1 for rows in expected['title'].values())     # duplicate titles covered
+
+    titles = list(expected['title'])[:20] + ['Not A Game', '']
+    assert title_rows(lookup, titles) == title_rows(expected, titles)
+    assert owned_rows(lookup, titles) == owned_rows(expected, titles)
+    assert lookup['app_id'].get(-1, -1) == -1 and 'x' not in lookup['app_id']
+
+
+def test_bundle_without_stored_lookup_rebuilds_it(bundle_root):
+    path = os.path.join(bundle_root, model_bundle.current_version(bundle_root), 'manifest.json')
+    with open(path, encoding='utf-8') as f:
+        manifest = json.load(f)
+    manifest['arrays'] = {k: v for k, v in manifest['arrays'].items() if not k.startswith('lookup.')}
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+
+    bundle = model_bundle.load_bundle(bundle_root)
+    assert bundle['lookup'] == build_lookup(bundle['games'])
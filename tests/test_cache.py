@@ -0,0 +1,139 @@
+import numpy as np
+import pytest
+
+import cache
+import engine
+from cache import ENTRY_OVERHEAD, ResultCache, SQLiteResultCache, cache_key
+
+
+class Clock:
+    """Stands in for the `time` module inside `cache`."""
+
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = Clock()
+    monkeypatch.setattr(cache, 'time', fake)
+    return fake
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def make(request, tmp_path):
+    def factory(**kwargs):
+        if request.param == 'sqlite':
+            return SQLiteResultCache(str(tmp_path / 'results.db'), **kwargs)
+        return ResultCache(**kwargs)
+    return factory
+
+
+def entry(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.permutation(10 * n)[:n], np.sort(rng.random(n))[::-1]
+
+
+ENTRY = 10 * 8 + ENTRY_OVERHEAD          # bytes of a 10-row entry
+
+
+def test_key_ignores_library_order():
+    assert cache_key('v1', 'exact', [5, 1, 9]) == cache_key('v1', 'exact', [9, 5, 1, 5])
+    assert cache_key('v1', 'exact', [5, 1]) != cache_key('v2', 'exact', [5, 1])
+    assert cache_key('v1', 'exact', [5, 1]) != cache_key('v1', 'ann', [5, 1])
+
+
+def test_round_trip(make, clock):
+    c = make()
+    rows, scores = entry(10)
+    assert c.get('a') is None
+    c.put('a', rows, scores)
+    got_rows, got_scores = c.get('a')
+    assert np.array_equal(got_rows, rows)
+    assert np.array_equal(got_scores, scores.astype(np.float32))
+    stats = c.stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (1, 1, 1)
+    assert stats['bytes'] == ENTRY
+
+
+def test_lru_eviction(make, clock):
+    c = make(max_bytes=3 * ENTRY)
+    for key in 'abc':
+        clock.now += 1
+        c.put(key, *entry(10))
+    clock.now += 1
+    assert c.get('a') is not None            # 'b' is now the least recently used
+    clock.now += 1
+    c.put('d', *entry(10))
+    assert c.get('b') is None
+    assert all(c.get(key) is not None for key in 'acd')
+    stats = c.stats()
+    assert (stats['evictions'], stats['entries'], stats['bytes']) == (1, 3, 3 * ENTRY)
+
+
+def test_ttl_expiry(make, clock):
+    c = make(ttl=60)
+    c.put('a', *entry(10))
+    clock.now += 59
+    assert c.get('a') is not None
+    clock.now += 2
+    assert c.get('a') is None
+    stats = c.stats()
+    assert (stats['expired'], stats['entries'], stats['bytes']) == (1, 0, 0)
+
+
+def test_byte_budget(make, clock):
+    c = make(max_bytes=5 * ENTRY)
+    c.put('big', *entry(1000))               # larger than the whole budget: not stored
+    assert c.get('big') is None
+    for i in range(20):
+        clock.now += 1
+        c.put(f'k{i}', *entry(10, seed=i))
+        assert c.stats()['bytes'] <= c.max_bytes
+    stats = c.stats()
+    assert (stats['entries'], stats['evictions']) == (5, 15)
+    assert all(c.get(f'k{i}') is not None for i in range(15, 20))
+
+
+def test_replacing_a_key_keeps_one_entry(make, clock):
+    c = make()
+    c.put('a', *entry(10, seed=1))
+    rows, scores = entry(10, seed=2)
+    c.put('a', rows, scores)
+    assert np.array_equal(c.get('a')[0], rows)
+    assert (c.stats()['entries'], c.stats()['bytes']) == (1, ENTRY)
+
+
+# ─────────────────────────────────────────────
+# ENGINE
+# ─────────────────────────────────────────────
+FILTERS = [dict(),
+           dict(budget=10, min_ratio=80),
+           dict(platform='mac', budget=5, min_ratio=90),
+           dict(platform='linux', budget=0, min_ratio=95),     # few survivors: the cached list runs short
+           dict(n=30, budget=1000, min_ratio=0)]
+
+
+def ranked(recs):
+    return [r['idx'] for r in recs], np.array([r['score'] for r in recs])
+
+
+@pytest.mark.parametrize('engine_name', engine.ENGINES)
+@pytest.mark.parametrize('blend', [None, {}])
+def test_cached_recommend_matches_uncached(models, make, engine_name, blend):
+    titles = list(dict.fromkeys(models['games']['title'].astype(str)))
+    results = make(top_m=cache.DEFAULT_TOP_M)
+    for library in (titles[:3], titles[40:45]):
+        for filters in FILTERS:
+            args = dict(engine=engine_name, blend=blend, **filters)
+            expected_rows, expected_scores = ranked(engine.recommend(models, library, **args))
+            for lib in (library, library[::-1]):       # a reordered library shares the entry
+                rows, scores = ranked(engine.recommend(models, lib, cache=results, **args))
+                assert rows == expected_rows
+                assert np.allclose(scores, expected_scores, atol=1e-6)
+    stats = results.stats()
+    assert stats['entries'] == 2
+    assert stats['hits'] >= 2 * (2 * len(FILTERS) - 1)
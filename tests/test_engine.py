@@ -0,0 +1,26 @@
+import numpy as np
+
+import engine
+
+
+def library(models, k=3):
+    """The first `k` distinct titles of the catalog."""
+    return list(dict.fromkeys(models['games']['title'].astype(str)))[:k]
+
+
+def test_blend_keeps_stage_one_similarity(models):
+    lib = library(models)
+    plain = engine.recommend(models, lib, budget=1000, min_ratio=0, n=50)
+    cosine = {r['idx']: r['score'] for r in plain}
+    blended = engine.recommend(models, lib, budget=1000, min_ratio=0, n=6, blend={})
+    assert blended
+    for rec in blended:
+        assert 0 <= rec['similarity'] <= 1 + 1e-6
+        if rec['idx'] in cosine:
+            assert np.isclose(rec['similarity'], cosine[rec['idx']], atol=1e-6)
+    assert any(not np.isclose(r['score'], r['similarity']) for r in blended)
+
+
+def test_similarity_is_score_without_blend(models):
+    for rec in engine.recommend(models, library(models), budget=1000, min_ratio=0, n=6):
+        assert rec['similarity'] == rec['score']
@@ -0,0 +1,118 @@
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from media import ThumbnailCache
+
+PNG  = b'\x89PNG\r\n\x1a\n' + b'\0' * 992          # 1000 bytes
+HTML = b'<html><body>Not here</body></html>'
+
+
+class ImageServer(ThreadingHTTPServer):
+    """
+    Serves /<app_id>: a 1000-byte PNG below 100, a PNG held back until
+    `release` is set for 100-199, an HTML page for 200-299 and 404 above.
+    """
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), ImageHandler)
+        self.requests = []
+        self.release  = threading.Event()
+
+
+class ImageHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        app_id = int(self.path.strip('/'))
+        self.server.requests.append(app_id)
+        if app_id >= 300:
+            self.send_error(404)
+            return
+        if 100 <= app_id < 200:
+            self.server.release.wait(10)
+        body = HTML if app_id >= 200 else PNG
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    srv = ImageServer()
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    yield srv
+    srv.release.set()
+    srv.shutdown()
+    srv.server_close()
+
+
+def thumbnails(server, root, **kwargs):
+    url = f'http://127.0.0.1:{server.server_address[1]}/{{app_id}}'
+    return ThumbnailCache(str(root), url_template=url, fetch_timeout=5, **kwargs)
+
+
+def settle(cache, timeout=5.0):
+    """Block until no download is pending."""
+    deadline = time.monotonic() + timeout
+    while cache.stats()['pending'] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert cache.stats()['pending'] == 0
+
+
+def test_slow_image_misses_deadline(server, tmp_path):
+    cache = thumbnails(server, tmp_path, render_timeout=0.1)
+    assert cache.wait_for([1], timeout=5) == {1: PNG}
+    assert cache.wait_for([1, 150]) == {1: PNG, 150: None}
+    assert cache.stats()['timeouts'] == 1
+    # still downloading: the next page does not wait for it again
+    assert cache.wait_for([150]) == {150: None}
+    assert cache.stats()['timeouts'] == 1
+    server.release.set()
+    settle(cache)
+    assert cache.wait_for([150]) == {150: PNG}
+    assert server.requests.count(150) == 1
+
+
+@pytest.mark.parametrize('app_id', [250, 404])
+def test_rejects_error_pages(server, tmp_path, app_id):
+    cache = thumbnails(server, tmp_path, render_timeout=5)
+    assert cache.wait_for([app_id]) == {app_id: None}
+    assert not os.path.exists(cache.path(app_id))
+    assert cache.stats()['failures'] == 1
+    # remembered as failed: not requested again within retry_after
+    assert cache.wait_for([app_id]) == {app_id: None}
+    assert server.requests == [app_id]
+
+
+def test_evicts_least_recently_used(server, tmp_path):
+    cache = thumbnails(server, tmp_path, max_bytes=2500)
+    cache.fetch(1)
+    cache.fetch(2)
+    os.utime(cache.path(1), (1000, 1000))
+    os.utime(cache.path(2), (2000, 2000))
+    assert cache.get(1) == PNG                     # a read marks 1 as recently used
+    cache.fetch(3)
+    assert os.path.exists(cache.path(1)) and os.path.exists(cache.path(3))
+    assert not os.path.exists(cache.path(2))
+    assert cache.stats()['evictions'] == 1
+    assert cache.stats()['bytes'] == 2 * len(PNG)
+
+
+def test_prefetch_fills_cache(server, tmp_path):
+    cache = thumbnails(server, tmp_path)
+    cache.prefetch([1, 2, 3])
+    settle(cache)
+    assert sorted(server.requests) == [1, 2, 3]
+    assert cache.wait_for([1, 2, 3]) == {1: PNG, 2: PNG, 3: PNG}
+    assert sorted(server.requests) == [1, 2, 3]    # served from disk
+    assert cache.stats()['hits'] == 3
+    cache.prefetch([1, 2, 3])                      # already cached: nothing queued
+    assert cache.stats()['pending'] == 0
@@ -0,0 +1,115 @@
+import numpy as np
+import pytest
+import scipy.sparse as sp
+from sklearn.metrics.pairwise import cosine_similarity
+
+import metrics
+
+
+@pytest.fixture(scope='module')
+def tfidf():
+    return sp.random(40, 25, density=0.3, format='csr', random_state=np.random.default_rng(0))
+
+
+def ild_pairwise(X, top_k):
+    """The original per-pair loop."""
+    rows  = [r for r in top_k if r >= 0]
+    total, pairs = 0.0, 0
+    for a in range(len(rows)):
+        for b in range(a + 1, len(rows)):
+            total += 1 - cosine_similarity(X[rows[a]], X[rows[b]])[0][0]
+            pairs += 1
+    return total / pairs if pairs else 0.0
+
+
+def gini_direct(counts):
+    """Mean absolute difference over all ordered pairs, / (2 · mean)."""
+    counts = np.asarray(counts, dtype=np.float64)
+    if counts.sum() == 0:
+        return 0.0
+    return np.abs(counts[:, None] - counts[None, :]).sum() / (2 * len(counts) ** 2 * counts.mean())
+
+
+# ─────────────────────────────────────────────
+# RANKING
+# ─────────────────────────────────────────────
+def test_ranking_hand_computed():
+    rel = np.array([[True, False, True]])                       # hits at ranks 1 and 3
+    assert metrics.precision_at_k(rel, 3)[0] == 2 / 3
+    assert metrics.recall_at_k(rel, np.array([4]), 3)[0] == 0.5
+    assert np.isclose(metrics.average_precision_at_k(rel, np.array([2]), 3)[0], (1 + 2 / 3) / 2)
+    assert np.isclose(metrics.ndcg_at_k(rel, np.array([2]), 3)[0],
+                      (1 + 1 / np.log2(4)) / (1 + 1 / np.log2(3)))
+
+
+def test_ranking_no_relevant_items():
+    rel = np.zeros((1, 3), dtype=bool)
+    n   = np.array([0])
+    assert metrics.recall_at_k(rel, n, 3)[0] == 0.0
+    assert metrics.ndcg_at_k(rel, n, 3)[0] == 0.0
+    assert metrics.average_precision_at_k(rel, n, 3)[0] == 0.0
+
+
+def test_label_relevance():
+    labels = np.array([0, 1, 0, 0, 1])
+    top    = np.array([[2, 1, -1], [4, 0, 3]])
+    relevant, n_relevant = metrics.label_relevance(top, np.array([0, 1]), labels)
+    assert relevant.tolist() == [[True, False, False], [True, False, False]]
+    assert n_relevant.tolist() == [2, 1]                       # the query itself excluded
+
+
+# ─────────────────────────────────────────────
+# DIVERSITY
+# ─────────────────────────────────────────────
+@pytest.mark.parametrize('k', [2, 5, 10])
+def test_ild_batch_matches_pairwise(tfidf, k):
+    lists = np.random.default_rng(k).integers(0, tfidf.shape[0], size=(70, k))   # > one chunk
+    lists[3, 1:] = -1                                                          # one valid row
+    lists[4, -1] = -1                                                          # an empty slot
+    expected = np.array([ild_pairwise(tfidf, l) for l in lists])
+    assert np.allclose(metrics.intra_list_diversity_batch(tfidf, lists, chunk=32), expected, atol=1e-10)
+    assert np.isclose(metrics.intra_list_diversity(tfidf, lists[0]), expected[0])
+    assert expected[3] == 0.0
+
+
+def test_ild_short_lists(tfidf):
+    assert np.array_equal(metrics.intra_list_diversity_batch(tfidf, np.array([[3], [4]])), [0.0, 0.0])
+
+
+# ─────────────────────────────────────────────
+# CATALOG-LEVEL METRICS
+# ─────────────────────────────────────────────
+def test_coverage():
+    assert metrics.catalog_coverage(np.array([[0, 1], [1, -1]]), 4) == 0.5
+    assert metrics.catalog_coverage(np.array([[2]]), 4) == 0.25
+    assert metrics.catalog_coverage(np.empty((0, 3), dtype=np.int64), 4) == 0.0
+    assert metrics.catalog_coverage(np.array([[-1, -1]]), 4) == 0.0
+
+
+@pytest.mark.parametrize('lists, n_items, expected', [
+    (np.arange(4)[:, None], 4, 0.0),                   # every item once: even exposure
+    (np.array([[2]]), 4, 0.75),                        # one item takes the only slot
+    (np.array([[0, 0], [0, 1]]), 3, 0.5),              # counts 3, 1, 0
+    (np.empty((0, 2), dtype=np.int64), 4, 0.0),        # nothing recommended
+    (np.array([[0]]), 1, 0.0),                         # single-item catalog
+])
+def test_gini_hand_computed(lists, n_items, expected):
+    counts = np.bincount(lists.ravel(), minlength=n_items)
+    assert np.isclose(gini_direct(counts), expected)
+    assert np.isclose(metrics.gini_index(lists, n_items), expected)
+
+
+def test_gini_random_matches_direct():
+    lists = np.random.default_rng(1).integers(0, 30, size=(20, 5))
+    assert np.isclose(metrics.gini_index(lists, 30), gini_direct(np.bincount(lists.ravel(), minlength=30)))
+
+
+def test_novelty_matches_log_popularity():
+    reviews = np.array([0, 9, 99, 999, 4])
+    lists   = np.array([[0, 1], [3, -1], [3, 4]])
+    share   = {i: (reviews[i] + 1) / (reviews + 1).sum() for i in range(len(reviews))}
+    items   = [r for r in lists.ravel() if r >= 0]
+    expected = np.mean([-np.log2(share[i]) for i in items])
+    assert np.isclose(metrics.novelty(lists, reviews), expected)
+    assert metrics.novelty(np.array([[-1, -1]]), reviews) == 0.0
+    assert metrics.novelty(lists, reviews) < metrics.novelty(np.array([[0]]), reviews)
@@ -0,0 +1,31 @@
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+import pipeline
+
+
+def synthetic_docs(n=5000, seed=7):
+    """Skewed draws from 150 words: more uni/bigrams than `max_features`, plus stop-word-only docs."""
+    rng   = np.random.default_rng(seed)
+    vocab = np.array([f'w{i}' for i in range(150)])
+    ranks = (rng.random((n, 20)) ** 2 * len(vocab)).astype(int)
+    docs  = [' '.join(vocab[r[:k]]) for r, k in zip(ranks, rng.integers(1, 21, size=n))]
+    docs[120:160] = ['the and of'] * 40                    # a whole chunk without a term
+    return docs
+
+
+def test_parallel_tfidf_matches_vectorizer():
+    docs = synthetic_docs()
+    reference = TfidfVectorizer(**pipeline.TFIDF_PARAMS)
+    expected  = reference.fit_transform(docs)
+    assert len(reference.vocabulary_) == pipeline.TFIDF_PARAMS['max_features']
+
+    vectorizer, matrix = pipeline.fit_tfidf_parallel(docs, n_jobs=2, chunksize=40)
+    assert vectorizer.vocabulary_ == reference.vocabulary_
+    assert np.allclose(vectorizer.idf_, reference.idf_)
+    assert matrix.shape == expected.shape
+    assert np.allclose(matrix.toarray(), expected.toarray())
+
+    unseen = ['w1 w2 w3', 'w5 w8 w13 w21', 'nothing known here', 'the']
+    assert np.allclose(vectorizer.transform(unseen).toarray(), reference.transform(unseen).toarray())
+    assert np.allclose(vectorizer.transform(docs[:200]).toarray(), expected[:200].toarray())
@@ -0,0 +1,58 @@
+import numpy as np
+
+from search import build_search_index, search_titles
+
+TITLES = ['Portal', 'Portal 2', 'Dota 2', 'Aporia', 'portal knights', 'Half-Life 2', None, 'Po']
+
+
+def brute_force(titles, query, limit):
+    q = query.lower()
+    norm = ['' if t is None else t.lower() for t in titles]
+    exact  = [i for i, t in enumerate(norm) if t == q]
+    prefix = [i for i, t in enumerate(norm) if t.startswith(q) and t != q]
+    inner  = [i for i, t in enumerate(norm) if q in t and not t.startswith(q)]
+    return (exact + prefix + inner)[:limit]
+
+
+def test_long_queries_match_brute_force():
+    index = build_search_index(TITLES)
+    for q in ('portal', 'ORTA', 'ta 2', 'life', 'xyz', 'a 2'):
+        assert search_titles(index, q, limit=10) == brute_force(TITLES, q, 10), q
+
+
+def test_short_queries_match_brute_force():
+    index = build_search_index(TITLES)
+    for q in ('po', 'P', '2', ' 2', 'a', 'z', '-'):
+        assert search_titles(index, q, limit=10) == brute_force(TITLES, q, 10), q
+    assert search_titles(index, '2', limit=10) == [1, 2, 5]         # Portal 2, Dota 2, Half-Life 2
+    assert search_titles(index, '', limit=10) == []
+
+
+class NoScan:
+    """Titles that fail the test if the search reads them one by one."""
+
+    def __init__(self, n):
+        self.n = n
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, row):
+        raise AssertionError('short query scanned the title column')
+
+
+def test_short_queries_do_not_scan_the_catalog():
+    rng    = np.random.default_rng(0)
+    titles = [''.join(rng.choice(list('bcdfg '), size=12)) for _ in range(5_000)]
+    index  = build_search_index(titles)
+    expected = {q: brute_force(titles, q, 100) for q in ('zq', 'c', ' d', 'g')}
+    index['norm'] = NoScan(len(titles))
+    for q, rows in expected.items():
+        assert search_titles(index, q, limit=100) == rows, q
+
+
+def test_index_without_short_postings_still_answers():
+    index = build_search_index(TITLES)
+    for key in ('short_grams', 'short_offsets', 'short_rows'):
+        del index[key]                                 # as restored from an older bundle
+    assert search_titles(index, '2', limit=10) == [1, 2, 5]
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import ann
+import benchmark
+import model_bundle
+import neighbors
+import update_catalog
+
+K = 20
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    benchmark.build_catalog(800, str(tmp_path), neighbor_k=K)
+    return tmp_path
+
+
+def write_delta(catalog, rng):
+    """Replaced rows with other games' titles, new rows, and one of each above the price limit."""
+    bundle = model_bundle.load_bundle(str(catalog / 'models'))
+    limit  = bundle['manifest']['cleaning']['price_limit']
+    raw    = pd.read_csv(catalog / 'games.csv')
+    raw    = raw[raw['app_id'].isin(bundle['games']['app_id'])]
+    picked = raw.sample(60, random_state=1)
+
+    replaced = picked.iloc[:30].copy()
+    replaced['title'] = picked['title'].iloc[30:].to_numpy()[rng.permutation(30)]
+    appended = picked.iloc[30:].copy()
+    appended['app_id'] = raw['app_id'].max() + 10 * np.arange(1, 31)
+    too_dear = pd.concat([raw[~raw['app_id'].isin(picked['app_id'])].iloc[:1],
+                          appended.iloc[:1].assign(app_id=1)])
+    too_dear['price_final'] = 10 * limit
+    delta = pd.concat([replaced, appended, too_dear])
+    delta.to_csv(catalog / 'delta.csv', index=False)
+    return replaced, appended, too_dear
+
+
+def test_apply_delta_matches_rebuild(catalog):
+    rng = np.random.default_rng(3)
+    replaced, appended, too_dear = write_delta(catalog, rng)
+    root = str(catalog / 'models')
+    n_old = len(model_bundle.load_bundle(root)['games'])
+
+    summary = update_catalog.apply_delta(str(catalog / 'delta.csv'), root)
+    assert (summary['replaced'], summary['appended']) == (30, 30)
+    assert (summary['removed'], summary['dropped']) == (1, 2)
+    assert summary['n_games'] == n_old + 30 - 1
+
+    bundle = model_bundle.load_bundle(root)
+    games  = bundle['games']
+    assert not games['app_id'].isin(too_dear['app_id']).any()
+    titles = dict(zip(games['app_id'], games['title'].astype(str)))
+    assert all(titles[a] == t for a, t in zip(replaced['app_id'], replaced['title']))
+    assert all(a in titles for a in appended['app_id'])
+
+    X = bundle['tfidf_matrix']
+    nbr_idx, nbr_sim = neighbors.table_from_bundle(bundle)
+    ref_idx, ref_sim = neighbors.build_neighbor_table(X, k=K)
+    assert nbr_idx.shape == ref_idx.shape
+    # ties may come in another order, so compare each row's scores as a sorted multiset
+    assert np.allclose(np.sort(nbr_sim.astype(np.float32), axis=1),
+                       np.sort(ref_sim.astype(np.float32), axis=1), atol=1e-3)
+    exact = (X @ X.T).toarray()
+    assert np.allclose(np.take_along_axis(exact, nbr_idx.astype(np.int64), axis=1), nbr_sim, atol=1e-3)
+    assert not (nbr_idx == np.arange(len(games))[:, None]).any()
+
+    emb, _, ivf = ann.ann_from_bundle(bundle)
+    assert len(emb) == len(games)
+    assert np.array_equal(np.sort(ivf['list_rows']), np.arange(len(games)))
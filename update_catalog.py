@@ -0,0 +1,202 @@
+"""
+Catalog updates without rerunning the notebook.
+
+Incremental mode (default) takes a delta CSV of new or changed games (same
+columns as `games.csv`), featurizes it with the bundle's saved feature
+model (field model or TfidfVectorizer), replaces rows whose `app_id` already exists, appends the
+rest, refreshes the derived indexes and publishes a new bundle version. A
+running app picks the new version up on its next rerun.
+
+Delta rows are cleaned with the bundle's saved cutoffs, so a row priced
+above the build's price limit is dropped. When that row updates a game
+already in the catalog, the game is removed, as a full refit of the
+updated CSV would drop it too; serving the old row would show a stale
+price. The summary counts both (`dropped`, `removed`).
+
+    python update_catalog.py delta.csv
+    python update_catalog.py --full games.csv      # scheduled full refit
+
+The (title) vocabulary and IDF weights stay frozen in incremental mode — terms
+first seen in a delta are ignored until the next full refit.
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.preprocessing import normalize
+
+import ann
+import features
+import model_bundle
+import neighbors
+import pipeline
+import rerank
+from search import build_search_index
+
+
+def _reorder(rows_old, rows_delta, take):
+    """Rows `take` of the old rows stacked above the delta rows."""
+    if sp.issparse(rows_old):
+        return sp.vstack([rows_old, rows_delta], format='csr')[take]
+    return np.concatenate([np.asarray(rows_old), np.asarray(rows_delta)])[take]
+
+
+def _no_filter_stats() -> dict:
+    inf = float('inf')
+    cols = list(pipeline.NORM_COLUMNS)
+    return {'price_limit': inf, 'min': dict.fromkeys(cols, 0.0), 'max': dict.fromkeys(cols, 1.0)}
+
+
+# ─────────────────────────────────────────────
+# INCREMENTAL UPDATE
+# ─────────────────────────────────────────────
+def apply_delta(delta_path: str, root: str = model_bundle.MODEL_DIR,
+                publish: bool = True) -> dict:
+    """
+    Merge `delta_path` into the current bundle and write a new version.
+
+    Returns a summary with the new version and the replaced / appended /
+    removed catalog rows, plus the delta rows cleaning dropped.
+    """
+    bundle = model_bundle.load_bundle(root)
+    vectorizer = model_bundle.load_vectorizer(bundle)
+    manifest   = bundle['manifest']
+    games_old  = bundle['games']
+    X_old      = bundle['tfidf_matrix']
+    n_old      = len(games_old)
+
+    # Clean the delta exactly like the original build (same price cutoff)
+    stats = manifest.get('cleaning') or _no_filter_stats()
+    delta, dropped = pipeline.load_delta(delta_path, stats)
+    X_delta = features.featurize(vectorizer, delta)
+    storage = manifest['tfidf']
+    if storage['normalized']:                       # stored rows are unit length
+        X_delta = normalize(X_delta, norm='l2')
+
+    # Row plan: replaced app_ids keep their position, new ones are appended
+    by_app   = bundle['lookup']['app_id']
+    existing = np.array([by_app.get(int(a), -1) for a in delta['app_id']], dtype=np.int64)
+    replaced = existing >= 0
+    take = np.arange(n_old + int((~replaced).sum()), dtype=np.int64)
+    take[existing[replaced]] = n_old + np.flatnonzero(replaced)
+    take[n_old:] = n_old + np.flatnonzero(~replaced)
+    changed = np.concatenate([existing[replaced], np.arange(n_old, len(take))])
+    # Catalog games whose updated row was dropped leave the catalog
+    removed = np.array(sorted(by_app[a] for a in dropped.tolist() if a in by_app), dtype=np.int64)
+    keep    = np.ones(len(take), dtype=bool)
+    keep[removed] = False
+
+    cols  = [c for c in model_bundle.GAME_COLUMNS if c in games_old.columns]
+    games = pd.concat([games_old[cols].astype(object), delta[cols].astype(object)],
+                      ignore_index=True).iloc[take].reset_index(drop=True)
+    games = games.astype({**{c: t for c, t in pipeline.GAME_DTYPES.items() if c in cols},
+                          'rating': pipeline.rating_dtype(games['rating'])})
+    merged = _reorder(X_old, X_delta, take)
+    games, tfidf_matrix = games[keep].reset_index(drop=True), merged[keep]
+    games['rating'] = games['rating'].cat.remove_unused_categories()
+
+    # Derived indexes
+    arrays = rerank.prior_arrays(rerank.build_priors(games))
+    if features.fields_from_bundle(bundle) is not None:
+        arrays.update(features.field_arrays(vectorizer, tfidf_matrix))
+    table = neighbors.table_from_bundle(bundle)
+    if table is not None:
+        table = neighbors.update_neighbor_table(*table, merged, changed)
+        if removed.size:
+            table = neighbors.remove_from_neighbor_table(*table, tfidf_matrix, removed)
+        arrays.update(neighbors.table_arrays(*table))
+    engine = ann.ann_from_bundle(bundle)
+    if engine is not None:
+        emb_old, components, ivf = engine
+        emb = _reorder(emb_old, ann.embed_rows(X_delta, components), take)
+        ivf = ann.update_ivf(ivf, emb, changed)
+        if removed.size:
+            emb, ivf = emb[keep], ann.remove_from_ivf(ivf, removed)
+        arrays.update(ann.ann_arrays(emb, components, ivf))
+
+    extra = {k: v for k, v in manifest.items()
+             if k not in ('format', 'format_version', 'version', 'created',
+                          'n_games', 'n_features', 'tfidf', 'arrays', 'columns', 'vectorizer')}
+    extra['parent']  = bundle['version']
+    extra['updated'] = {'replaced': int(replaced.sum()), 'appended': int((~replaced).sum()),
+                        'removed': int(removed.size), 'dropped': int(dropped.size),
+                        'delta': delta_path}
+    version = model_bundle.write_bundle(
+        root, tfidf_matrix, games, vectorizer=vectorizer,
+        search_index=build_search_index(games['title']),
+        arrays=arrays, publish_current=publish, extra=extra,
+        values=storage['values'], normalized=storage['normalized'])
+    return {'version': version, **extra['updated'], 'n_games': len(games)}
+
+
+# ─────────────────────────────────────────────
+# FULL REFIT
+# ─────────────────────────────────────────────
+def full_refit(csv_path: str, root: str = model_bundle.MODEL_DIR, publish: bool = True,
+               neighbor_k: int = neighbors.DEFAULT_K, with_ann: bool = True,
+               n_jobs: int = None, feature_model: str = 'text', values: str = 'float32') -> dict:
+    """
+    Rebuild every artifact from `csv_path`, as the notebook's export does.
+
+    feature_model='text' (default) is the single TF-IDF over the
+    repeated-field string; 'fields' opts in to the weighted-field blocks
+    (`features`). `values` is the matrix storage (see
+    `model_bundle.encode_matrix`).
+    """
+    stats = pipeline.scan_games_csv(csv_path)
+    games = pipeline.load_games(csv_path, stats)
+    arrays = rerank.prior_arrays(rerank.build_priors(games))
+    if feature_model == 'fields':
+        vectorizer, tfidf_matrix = features.fit_fields(games)
+        arrays.update(features.field_arrays(vectorizer, tfidf_matrix))
+    else:
+        vectorizer, tfidf_matrix = pipeline.fit_tfidf(games, n_jobs=n_jobs)
+
+    if neighbor_k:
+        arrays.update(neighbors.table_arrays(*neighbors.build_neighbor_table(tfidf_matrix, k=neighbor_k)))
+    if with_ann:
+        emb, components = ann.build_embeddings(tfidf_matrix)
+        arrays.update(ann.ann_arrays(emb, components, ann.build_ivf(emb)))
+
+    version = model_bundle.write_bundle(
+        root, tfidf_matrix, games, vectorizer=vectorizer,
+        search_index=build_search_index(games['title']),
+        arrays=arrays, publish_current=publish, values=values,
+        extra={'cleaning': pipeline.cleaning_params(stats)})
+    return {'version': version, 'n_games': len(games)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Update the SteamLens model bundle')
+    parser.add_argument('csv', help='delta CSV (incremental) or full games CSV (--full)')
+    parser.add_argument('--full', action='store_true', help='refit everything from scratch')
+    parser.add_argument('--models', default=model_bundle.MODEL_DIR, help='bundle root directory')
+    parser.add_argument('--no-publish', action='store_true', help='write the version but keep CURRENT')
+    parser.add_argument('--keep', type=int, default=3, help='versions to keep after publishing')
+    parser.add_argument('--jobs', type=int, default=None, help='processes for the --full TF-IDF build')
+    parser.add_argument('--feature-model', choices=('text', 'fields'), default='text',
+                        help='--full feature model: one TF-IDF string or weighted field blocks')
+    parser.add_argument('--values', choices=model_bundle.MATRIX_VALUES, default='float32',
+                        help='--full matrix storage (incremental updates keep the bundle\'s)')
+    args = parser.parse_args()
+
+    t0 = time.time()
+    if args.full:
+        summary = full_refit(args.csv, args.models, publish=not args.no_publish, n_jobs=args.jobs,
+                             feature_model=args.feature_model, values=args.values)
+    else:
+        summary = apply_delta(args.csv, args.models, publish=not args.no_publish)
+    pruned = model_bundle.prune_versions(args.models, keep=args.keep) if not args.no_publish else []
+
+    print(f' Wrote {args.models}/{summary["version"]} in {time.time() - t0:.1f} s')
+    for key, value in summary.items():
+        if key != 'version':
+            print(f'   {key:10s} {value}')
+    if pruned:
+        print(f'   pruned     {", ".join(pruned)}')
+
+
+if __name__ == '__main__':
+    main()